@@ -1,36 +1,5 @@
-from dlgo.gotypes import Point
+from dlgo.goboard_fast import is_point_an_eye
 
 __all__ = [
     'is_point_an_eye',
 ]
-
-
-def is_point_an_eye(board, point, color):
-    if board.get(point) is not None:
-        return False
-
-    for neighbor in board.neighbors(point):
-        neighbor_color = board.get(neighbor)
-        if neighbor_color != color:
-            return False
-
-    friendly_corners = 0
-    off_board_corners = 0
-    corners = [
-        Point(point.row - 1, point.col - 1),
-        Point(point.row - 1, point.col + 1),
-        Point(point.row + 1, point.col - 1),
-        Point(point.row + 1, point.col + 1),
-    ]
-    for corner in corners:
-        if board.is_on_grid(corner):
-            corner_color = board.get(corner)
-            if corner_color == color:
-                friendly_corners += 1
-        else:
-            off_board_corners += 1
-    if off_board_corners > 0:
-
-        return off_board_corners + friendly_corners == 4
-
-    return friendly_corners >= 3
@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+import gzip
+import json
+import os
+import tarfile
+
+__all__ = [
+    'ArchiveIndex',
+]
+
+
+class ArchiveIndex:
+    """Member names and offsets of a .tar.gz archive, saved next to it.
+
+    members is a list of (name, offset, size) in archive order, where
+    offset is the position of the member's data in the uncompressed tar
+    stream. With it, members are read by seeking forward in one gzip
+    stream, with no .tar written to disk and no tar headers parsed again.
+
+    The index is stored as <archive>.index.json and rebuilt if the
+    archive's size or modification time no longer match.
+    """
+
+    def __init__(self, archive_path, members):
+        self.archive_path = archive_path
+        self.members = members
+
+    @staticmethod
+    def index_path(archive_path):
+        return archive_path + '.index.json'
+
+    @staticmethod
+    def _stamp(archive_path):
+        stat = os.stat(archive_path)
+        return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+    @classmethod
+    def load(cls, archive_path):
+        """The saved index of archive_path, or None if there is no valid one."""
+        try:
+            with open(cls.index_path(archive_path)) as index_file:
+                saved = json.load(index_file)
+        except (IOError, OSError, ValueError):
+            return None
+        if saved.get('archive') != cls._stamp(archive_path):
+            return None
+        return cls(archive_path, [tuple(member) for member in saved['members']])
+
+    def save(self):
+        index_path = self.index_path(self.archive_path)
+        temp_path = index_path + '.tmp.%d' % os.getpid()
+        with open(temp_path, 'w') as index_file:
+            json.dump({'archive': self._stamp(self.archive_path), 'members': self.members},
+                      index_file)
+        os.rename(temp_path, index_path)
+
+    def names(self):
+        return [name for name, offset, size in self.members]
+
+    def read(self, positions):
+        """Yield (position, content) for members at the given list positions.
+
+        Members are read in archive order, whatever the order of positions.
+        """
+        with gzip.open(self.archive_path) as stream:
+            for position in sorted(set(positions)):
+                name, offset, size = self.members[position]
+                stream.seek(offset)
+                yield position, stream.read(size)
+
+    @classmethod
+    def open(cls, archive_path, positions=()):
+        """Load or build the index and read the members at positions.
+
+        Returns (index, contents) with contents mapping position to bytes.
+        Without a saved index the archive is streamed once: the index is
+        built and the wanted members are read in the same pass.
+        """
+        index = cls.load(archive_path)
+        if index is not None:
+            return index, dict(index.read(positions))
+
+        wanted = set(positions)
+        members = []
+        contents = {}
+        with tarfile.open(archive_path, 'r|gz') as tar:
+            for position, member in enumerate(tar):
+                members.append((member.name, member.offset_data, member.size))
+                if position in wanted:
+                    member_file = tar.extractfile(member)
+                    contents[position] = b'' if member_file is None else member_file.read()
+        index = cls(archive_path, members)
+        index.save()
+        return index, contents
@@ -0,0 +1,44 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from dlgo.data.archive import ArchiveIndex
+
+
+class ArchiveIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.archive_path = os.path.join(self.data_dir, 'KGS-2001-19-3-.tar.gz')
+        self.contents = [('games/%d.sgf' % i, ('(;SZ[19];B[%s])' % chr(97 + i)).encode() * (i + 1))
+                         for i in range(5)]
+        with tarfile.open(self.archive_path, 'w:gz') as tar:
+            for name, content in self.contents:
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_index_is_built_once_and_reused(self):
+        index, contents = ArchiveIndex.open(self.archive_path, [3, 1])
+        self.assertEqual([name for name, _ in self.contents], index.names())
+        self.assertEqual({1: self.contents[1][1], 3: self.contents[3][1]}, contents)
+        self.assertTrue(os.path.isfile(ArchiveIndex.index_path(self.archive_path)))
+
+        saved = ArchiveIndex.load(self.archive_path)
+        self.assertEqual(index.members, saved.members)
+        _, contents = ArchiveIndex.open(self.archive_path, [4, 0, 4])
+        self.assertEqual({0: self.contents[0][1], 4: self.contents[4][1]}, contents)
+
+    def test_changed_archive_is_reindexed(self):
+        ArchiveIndex.open(self.archive_path)
+        os.utime(self.archive_path, (0, 0))
+        self.assertIsNone(ArchiveIndex.load(self.archive_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
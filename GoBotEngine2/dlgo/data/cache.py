@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+import os
+
+import numpy as np
+
+from dlgo.data.archive import ArchiveIndex
+from dlgo.data.compact import compact_features, compact_labels, expand_features
+from dlgo.data.streaming import encoder_key
+
+__all__ = [
+    'GameCache',
+]
+
+
+class GameCache:
+    """Encoded games kept on disk between runs.
+
+    A game is stored under <cache_dir>/<encoder key>/<archive>/<position>.npz,
+    where the encoder key holds the encoder's name, version and shape and
+    position is the game's member position in the archive. Each entry also
+    keeps the member's name, so a game is only reused if the archive still
+    has it at that position. Features and labels are stored compactly.
+
+    games() encodes only the games that have no entry yet, so drawing a
+    new sample mostly reads from the cache.
+    """
+
+    def __init__(self, cache_dir, encoder):
+        self.encoder = encoder
+        self.feature_shape = tuple(encoder.shape())
+        self.directory = os.path.join(cache_dir, encoder_key(encoder))
+
+    def path(self, archive_name, position):
+        archive_base = os.path.basename(archive_name).replace('.tar.gz', '')
+        return os.path.join(self.directory, archive_base, '%d.npz' % position)
+
+    def member(self, archive_name, position):
+        """Name of the member cached at position, or None if there is no entry."""
+        try:
+            with np.load(self.path(archive_name, position)) as entry:
+                return str(entry['member'])
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def get(self, archive_name, position, member_name):
+        """(features, labels) cached for member_name at position, or None."""
+        try:
+            with np.load(self.path(archive_name, position)) as entry:
+                if str(entry['member']) != member_name:
+                    return None
+                return (expand_features(entry['features'], self.feature_shape, dtype='float64'),
+                        entry['labels'].astype(np.float64))
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def put(self, archive_name, position, member_name, features, labels):
+        path = self.path(archive_name, position)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Another worker made it first.
+                if not os.path.isdir(directory):
+                    raise
+        temp_path = path + '.tmp.%d' % os.getpid()
+        with open(temp_path, 'wb') as entry:
+            np.savez(entry, features=compact_features(features), labels=compact_labels(labels),
+                     member=np.array(member_name))
+        os.rename(temp_path, path)
+
+    def games(self, archive_path, positions, encode):
+        """Yield (position, features, labels) for the members at positions.
+
+        Cached games are read back; the rest are read from the archive in
+        one pass, encoded with encode(member_name, content) -> (features,
+        labels) and added to the cache. Games come in the order of
+        positions.
+        """
+        # Only member names are read up front; cached games are loaded one
+        # at a time as they are yielded.
+        cached = {}
+        for position in positions:
+            member_name = self.member(archive_path, position)
+            if member_name is not None:
+                cached[position] = member_name
+        missing = [position for position in positions if position not in cached]
+        index, contents = ArchiveIndex.open(archive_path, missing)
+        names = index.names()
+
+        stale = [position for position in cached if cached[position] != names[position]]
+        if stale:
+            for position in stale:
+                del cached[position]
+            contents.update(index.read(stale))
+
+        for position in positions:
+            game = None
+            if position in cached:
+                game = self.get(archive_path, position, names[position])
+            if game is not None:
+                features, labels = game
+            else:
+                if position not in contents:
+                    # The entry went away after it was found.
+                    contents.update(index.read([position]))
+                features, labels = encode(names[position], contents.pop(position))
+                self.put(archive_path, position, names[position], features, labels)
+            yield position, features, labels
@@ -0,0 +1,80 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+import numpy as np
+
+from dlgo.data.cache import GameCache
+from dlgo.encoders.oneplane import OnePlaneEncoder
+
+
+class VersionTwoEncoder(OnePlaneEncoder):
+    def version(self):
+        return 2
+
+
+class GameCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.archive_path = os.path.join(self.data_dir, 'KGS-2001-19-3-.tar.gz')
+        self.write_archive(['games/%d.sgf' % i for i in range(4)])
+        self.cache = GameCache(os.path.join(self.data_dir, 'cache'), OnePlaneEncoder((19, 19)))
+        self.encoded = []
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def write_archive(self, names):
+        with tarfile.open(self.archive_path, 'w:gz') as tar:
+            for name in names:
+                info = tarfile.TarInfo(name)
+                info.size = len(name)
+                tar.addfile(info, io.BytesIO(name.encode()))
+
+    def encode(self, name, content):
+        self.encoded.append(name)
+        position = int(name.split('/')[1].split('.')[0])
+        features = np.zeros((2, 1, 19, 19))
+        features[:, 0, position, position] = 1
+        return features, np.array([position, position + 19.0])
+
+    def games(self, cache, positions):
+        return list(cache.games(self.archive_path, positions, self.encode))
+
+    def test_only_new_games_are_encoded(self):
+        first = self.games(self.cache, [2, 0])
+        self.assertEqual(['games/2.sgf', 'games/0.sgf'], self.encoded)
+
+        self.encoded = []
+        second = self.games(self.cache, [3, 0, 2])
+        self.assertEqual(['games/3.sgf'], self.encoded)
+        self.assertEqual([3, 0, 2], [position for position, _, _ in second])
+        cached = dict((position, (features, labels)) for position, features, labels in second)
+        for position, features, labels in first:
+            self.assertTrue(np.array_equal(features, cached[position][0]))
+            self.assertTrue(np.array_equal(labels, cached[position][1]))
+
+    def test_encoder_version_has_its_own_entries(self):
+        self.games(self.cache, [1])
+        other = GameCache(os.path.join(self.data_dir, 'cache'), VersionTwoEncoder((19, 19)))
+        self.encoded = []
+        self.games(other, [1])
+        self.assertEqual(['games/1.sgf'], self.encoded)
+        self.assertNotEqual(self.cache.directory, other.directory)
+
+    def test_entry_for_another_member_is_redone(self):
+        self.games(self.cache, [1, 2])
+        self.write_archive(['games/%d.sgf' % i for i in (0, 3, 2, 1)])
+        # A new download of the archive.
+        os.utime(self.archive_path, (0, 0))
+        self.encoded = []
+        self.games(self.cache, [1, 2])
+        self.assertEqual(['games/3.sgf'], self.encoded)
+        self.assertIsNotNone(self.cache.get(self.archive_path, 1, 'games/3.sgf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+from __future__ import absolute_import
+import numpy as np
+
+__all__ = [
+    'compact_features',
+    'compact_labels',
+    'expand_features',
+]
+
+
+def compact_features(features):
+    """Store a batch of encoded positions in as few bytes as they allow.
+
+    Planes that only hold 0 and 1 are bit-packed into a (N, num_bytes)
+    uint8 array, one row per position. Other planes must hold integers
+    that fit an int8 and keep their shape. Anything else raises
+    ValueError.
+    """
+    stored = features.astype(np.int8)
+    if not np.array_equal(stored, features):
+        raise ValueError('Features must be integers between -128 and 127 to be stored compactly')
+    if stored.size and stored.min() >= 0 and stored.max() <= 1:
+        return np.packbits(stored.reshape(len(stored), -1), axis=1)
+    return stored
+
+
+def compact_labels(labels):
+    """Move indices as int16."""
+    return np.asarray(labels).astype(np.int16)
+
+
+def expand_features(stored, feature_shape, dtype='float32'):
+    """Undo compact_features for positions of the given feature_shape.
+
+    Float arrays written before the compact format are only cast.
+    """
+    if stored.dtype == np.uint8 and stored.ndim == 2:
+        num_values = int(np.prod(feature_shape))
+        unpacked = np.unpackbits(stored, axis=1, count=num_values)
+        return unpacked.reshape((len(stored),) + tuple(feature_shape)).astype(dtype)
+    return stored.astype(dtype)
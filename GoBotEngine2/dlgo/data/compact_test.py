@@ -0,0 +1,37 @@
+import unittest
+
+import numpy as np
+
+from dlgo.data.compact import compact_features, compact_labels, expand_features
+
+
+class CompactTest(unittest.TestCase):
+    def test_binary_planes_are_bit_packed(self):
+        features = (np.random.RandomState(1).rand(5, 7, 19, 19) > 0.8).astype(np.float64)
+        stored = compact_features(features)
+        self.assertEqual(np.uint8, stored.dtype)
+        self.assertEqual((5, (7 * 19 * 19 + 7) // 8), stored.shape)
+        expanded = expand_features(stored, (7, 19, 19))
+        self.assertEqual(np.float32, expanded.dtype)
+        self.assertTrue(np.array_equal(features, expanded))
+
+    def test_signed_planes_are_int8(self):
+        features = np.random.RandomState(2).randint(-1, 2, size=(3, 1, 9, 9)).astype(np.float64)
+        stored = compact_features(features)
+        self.assertEqual(np.int8, stored.dtype)
+        self.assertTrue(np.array_equal(features, expand_features(stored, (1, 9, 9))))
+
+    def test_fractional_planes_are_rejected(self):
+        with self.assertRaises(ValueError):
+            compact_features(np.full((1, 1, 2, 2), 0.5))
+
+    def test_legacy_float_chunks_are_cast(self):
+        features = np.ones((2, 1, 3, 3))
+        self.assertEqual(np.float32, expand_features(features, (1, 3, 3)).dtype)
+
+    def test_labels(self):
+        self.assertEqual(np.int16, compact_labels(np.array([360.0, 0.0])).dtype)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+from __future__ import print_function
+from __future__ import absolute_import
+import json
+import os
+import shutil
+import sys
+from multiprocessing.pool import ThreadPool
+if sys.version_info[0] == 3:
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+else:
+    from urllib2 import HTTPError, Request, urlopen
+
+__all__ = [
+    'Downloader',
+]
+
+
+class Downloader:
+    """Fetch files into a directory so that only complete files ever appear.
+
+    A file is written to <target>.part and renamed to its target once its
+    size matches the size the source reported. A .part left by an
+    interrupted run is resumed with an HTTP Range request, or started
+    over if the server does not honor it.
+
+    Completed files and their sizes are recorded in downloads.json in the
+    target directory. Files found under their final name but not recorded,
+    such as ones left by older versions, are checked against the source's
+    size before they are trusted; if the source cannot be reached or does
+    not report a size they are kept as they are, as older versions did,
+    but not recorded, so the next run checks them again.
+
+    At most max_connections files are fetched at once, whatever the
+    number of CPUs. With mirror, files are taken from there instead of
+    their URLs: a local directory or the base URL of an HTTP server
+    holding the files under the same names.
+    """
+
+    def __init__(self, directory, max_connections=4, mirror=None, retries=3,
+                 block_size=1 << 16, timeout=60):
+        self.directory = directory
+        self.max_connections = max_connections
+        self.mirror = mirror
+        self.retries = retries
+        self.block_size = block_size
+        self.timeout = timeout
+        self.record_path = os.path.join(directory, 'downloads.json')
+
+    def source(self, url, name):
+        """Where to fetch name from: url, or its place in the mirror."""
+        if self.mirror is None:
+            return url
+        if self.mirror.startswith(('http://', 'https://', 'file://')):
+            return self.mirror.rstrip('/') + '/' + name
+        return os.path.join(self.mirror, name)
+
+    def _records(self):
+        try:
+            with open(self.record_path) as records:
+                return json.load(records)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _record(self, name, size):
+        # Called from the main thread only, so threads of one download do
+        # not lose each other's records. Processes sharing the directory
+        # can still overwrite each other's update; the records they lose
+        # are only checked against the source again next time.
+        records = self._records()
+        records[name] = size
+        temp_path = self.record_path + '.tmp.%d' % os.getpid()
+        with open(temp_path, 'w') as record_file:
+            json.dump(records, record_file, indent=1, sort_keys=True)
+        os.rename(temp_path, self.record_path)
+
+    def _open(self, source, offset):
+        """(stream, total size, whether the stream starts at offset)."""
+        if '://' not in source:
+            stream = open(source, 'rb')
+            stream.seek(offset)
+            return stream, os.fstat(stream.fileno()).st_size, True
+        request = Request(source)
+        if offset:
+            request.add_header('Range', 'bytes=%d-' % offset)
+        try:
+            stream = urlopen(request, timeout=self.timeout)
+        except HTTPError as e:
+            if e.code == 416 and offset:
+                # Nothing left after offset; the .part may be complete.
+                return None, None, True
+            raise
+        content_range = stream.headers.get('Content-Range')
+        if offset and content_range is not None and stream.getcode() == 206:
+            return stream, int(content_range.split('/')[-1]), True
+        length = stream.headers.get('Content-Length')
+        return stream, None if length is None else int(length), False
+
+    def _source_size(self, source):
+        if '://' not in source:
+            return os.path.getsize(source)
+        request = Request(source)
+        request.get_method = lambda: 'HEAD'
+        response = urlopen(request, timeout=self.timeout)
+        length = response.headers.get('Content-Length')
+        response.close()
+        return None if length is None else int(length)
+
+    def _fetch_once(self, source, target_path):
+        part_path = target_path + '.part'
+        offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+        stream, size, resumed = self._open(source, offset)
+        if stream is None:
+            size = self._source_size(source)
+        else:
+            try:
+                with open(part_path, 'ab' if resumed else 'wb') as part:
+                    shutil.copyfileobj(stream, part, self.block_size)
+            finally:
+                stream.close()
+        written = os.path.getsize(part_path)
+        if size is not None and written != size:
+            if written > size:
+                # Not a prefix of this source; start over next time.
+                os.remove(part_path)
+            raise IOError('%s is %d bytes, expected %d' % (part_path, written, size))
+        os.rename(part_path, target_path)
+        return written
+
+    def fetch(self, url, target_path, name=None):
+        """Download url, or its mirror copy, to target_path; returns its size."""
+        name = name or os.path.basename(target_path)
+        source = self.source(url, name)
+        error = None
+        for _ in range(self.retries):
+            try:
+                return self._fetch_once(source, target_path)
+            except (IOError, OSError) as e:
+                # Whatever arrived is kept in the .part and resumed.
+                error = e
+        raise error
+
+    def _is_complete(self, url, name, records):
+        """True if name is complete, False if it must be fetched, None if it
+        is kept without knowing whether it is complete."""
+        target_path = os.path.join(self.directory, name)
+        if not os.path.isfile(target_path):
+            return False
+        size = os.path.getsize(target_path)
+        if name in records:
+            return records[name] == size
+        try:
+            source_size = self._source_size(self.source(url, name))
+        except (IOError, OSError):
+            return None
+        if source_size is None:
+            return None
+        return source_size == size
+
+    def download(self, urls_and_names):
+        """Fetch every (url, name) into the directory that is not complete there."""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        records = self._records()
+
+        def is_complete(url_and_name):
+            url, name = url_and_name
+            return self._is_complete(url, name, records)
+
+        def fetch(url_and_name):
+            url, name = url_and_name
+            print('>>> Downloading ' + name)
+            return name, self.fetch(url, os.path.join(self.directory, name), name)
+
+        pool = ThreadPool(processes=self.max_connections)
+        try:
+            checks = pool.map(is_complete, urls_and_names)
+            missing = []
+            for (url, name), complete in zip(urls_and_names, checks):
+                if complete is False:
+                    missing.append((url, name))
+                elif complete and name not in records:
+                    self._record(name, os.path.getsize(os.path.join(self.directory, name)))
+            for name, size in pool.imap_unordered(fetch, missing):
+                self._record(name, size)
+        finally:
+            pool.close()
+            pool.join()
@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from dlgo.data.download import Downloader
+
+CONTENT = bytes(bytearray(range(256))) * 40
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    honor_range = True
+    ranges = []
+
+    def do_GET(self):
+        body = CONTENT
+        requested = self.headers.get('Range')
+        RangeHandler.ranges.append(requested)
+        if requested is not None and self.honor_range:
+            start = int(requested.split('=')[1].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, len(body) - 1, len(body)))
+            body = body[start:]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.mirror_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.mirror_dir, 'KGS-2001-19-3-.tar.gz'), 'wb') as mirrored:
+            mirrored.write(CONTENT)
+        RangeHandler.ranges = []
+        RangeHandler.honor_range = True
+        self.server = HTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/KGS-2001-19-3-.tar.gz' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.data_dir)
+        shutil.rmtree(self.mirror_dir)
+
+    def target(self):
+        return os.path.join(self.data_dir, 'KGS-2001-19-3-.tar.gz')
+
+    def read_target(self):
+        with open(self.target(), 'rb') as downloaded:
+            return downloaded.read()
+
+    def write_part(self, size):
+        with open(self.target() + '.part', 'wb') as part:
+            part.write(CONTENT[:size])
+
+    def test_mirror_directory(self):
+        downloader = Downloader(self.data_dir, mirror=self.mirror_dir)
+        downloader.download([('http://unreachable.invalid/KGS-2001-19-3-.tar.gz',
+                              'KGS-2001-19-3-.tar.gz')])
+        self.assertEqual(CONTENT, self.read_target())
+        self.assertEqual(['KGS-2001-19-3-.tar.gz', 'downloads.json'], sorted(os.listdir(self.data_dir)))
+        with open(os.path.join(self.data_dir, 'downloads.json')) as records:
+            self.assertEqual({'KGS-2001-19-3-.tar.gz': len(CONTENT)}, json.load(records))
+
+    def test_part_is_resumed_with_range(self):
+        self.write_part(1000)
+        Downloader(self.data_dir).download([(self.url, 'KGS-2001-19-3-.tar.gz')])
+        self.assertEqual(['bytes=1000-'], RangeHandler.ranges)
+        self.assertEqual(CONTENT, self.read_target())
+        self.assertFalse(os.path.exists(self.target() + '.part'))
+
+    def test_range_ignored_starts_over(self):
+        RangeHandler.honor_range = False
+        self.write_part(1000)
+        Downloader(self.data_dir).download([(self.url, 'KGS-2001-19-3-.tar.gz')])
+        self.assertEqual(CONTENT, self.read_target())
+
+    def test_complete_files_are_not_fetched_again(self):
+        downloader = Downloader(self.data_dir, mirror=self.url.rsplit('/', 1)[0])
+        downloader.download([(None, 'KGS-2001-19-3-.tar.gz')])
+        downloader.download([(None, 'KGS-2001-19-3-.tar.gz')])
+        self.assertEqual([None], RangeHandler.ranges)
+
+    def test_truncated_file_is_fetched_again(self):
+        with open(self.target(), 'wb') as truncated:
+            truncated.write(CONTENT[:100])
+        Downloader(self.data_dir, mirror=self.mirror_dir).download(
+            [(self.url, 'KGS-2001-19-3-.tar.gz')])
+        self.assertEqual(CONTENT, self.read_target())
+
+    def test_unrecorded_file_is_kept_when_source_is_unreachable(self):
+        with open(self.target(), 'wb') as existing:
+            existing.write(CONTENT[:100])
+        Downloader(self.data_dir, mirror=self.data_dir + '/missing').download(
+            [(self.url, 'KGS-2001-19-3-.tar.gz')])
+        self.assertEqual(CONTENT[:100], self.read_target())
+        # Not recorded, so a run that reaches the source checks it again.
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, 'downloads.json')))
+        Downloader(self.data_dir, mirror=self.mirror_dir).download(
+            [(self.url, 'KGS-2001-19-3-.tar.gz')])
+        self.assertEqual(CONTENT, self.read_target())
+
+
+if __name__ == '__main__':
+    unittest.main()
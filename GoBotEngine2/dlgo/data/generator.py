@@ -1,40 +1,127 @@
-import glob
+import threading
+
 import numpy as np
 from keras.utils import to_categorical
+from six.moves import queue
+
+from dlgo.data.compact import expand_features
+from dlgo.data.streaming import chunk_files, read_summary
 
 
 class DataGenerator:
-    def __init__(self, data_directory, samples):
+    """Shuffled mini-batches from the processed chunks of the sampled archives.
+
+    Chunk files are memory-mapped and samples are addressed by
+    (chunk, row), so every epoch draws batches from one permutation of
+    all samples without loading whole files. Sample counts come from the
+    manifest process_zip writes, so counting maps no chunk; only data
+    processed before manifests listed their chunks is counted from the
+    chunk files. Only the rows of each batch are read and expanded to
+    float32 and one-hot.
+
+    generate() builds up to `prefetch` batches ahead on a background
+    thread. Each epoch is shuffled with seed + epoch; a last partial batch
+    is dropped.
+    """
+
+    def __init__(self, data_directory, samples, data_type='train', seed=1337, prefetch=4):
         self.data_directory = data_directory
         self.samples = samples
+        self.data_type = data_type
         self.files = set(file_name for file_name, index in samples)
+        self.seed = seed
+        self.prefetch = prefetch
         self.num_samples = None
+        self._chunks = None
+
+    def _file_names(self):
+        return [zip_file_name.replace('.tar.gz', '') + self.data_type
+                for zip_file_name in sorted(self.files)]
+
+    def _load_chunks(self):
+        """(feature memmap, label memmap, feature shape) for every chunk."""
+        if self._chunks is not None:
+            return self._chunks
+        self._chunks = []
+        for file_name in self._file_names():
+            for feature_file, label_file, feature_shape in chunk_files(self.data_directory,
+                                                                      file_name):
+                x = np.load(feature_file, mmap_mode='r')
+                y = np.load(label_file, mmap_mode='r')
+                self._chunks.append((x, y, feature_shape or x.shape[1:]))
+        return self._chunks
 
     def get_num_samples(self, batch_size=128, num_classes=19 * 19):
-        if self.num_samples is not None:
-            return self.num_samples
-        else:
-            self.num_samples = 0
-            for X, y in self._generate(batch_size=batch_size, num_classes=num_classes):
-                self.num_samples += X.shape[0]
-            return self.num_samples
-
-    def _generate(self, batch_size, num_classes):
-        for zip_file_name in self.files:
-            file_name = zip_file_name.replace('.tar.gz', '') + 'train'
-            base = self.data_directory + '/' + file_name + '_features_*.npy'
-            for feature_file in glob.glob(base):
-                label_file = feature_file.replace('features', 'labels')
-                x = np.load(feature_file)
-                y = np.load(label_file)
-                x = x.astype('float32')
-                y = to_categorical(y.astype(int), num_classes)
-                while x.shape[0] >= batch_size:
-                    x_batch, x = x[:batch_size], x[batch_size:]
-                    y_batch, y = y[:batch_size], y[batch_size:]
-                    yield x_batch, y_batch
+        if self.num_samples is None:
+            num_samples = 0
+            for file_name in self._file_names():
+                summary = read_summary(self.data_directory + '/' + file_name)
+                if summary is not None and 'chunks' in summary:
+                    num_samples += sum(chunk['num_samples'] for chunk in summary['chunks'])
+                else:
+                    num_samples += sum(len(np.load(label_file, mmap_mode='r'))
+                                       for _, label_file, _ in chunk_files(self.data_directory,
+                                                                           file_name))
+            self.num_samples = num_samples
+        return self.num_samples
+
+    def _batch(self, chunk_ids, rows, num_classes):
+        chunks = self._load_chunks()
+        features = []
+        labels = []
+        for chunk_id in np.unique(chunk_ids):
+            # Reading each chunk's rows in file order keeps the access
+            # pattern sequential within the mapped file.
+            chunk_rows = np.sort(rows[chunk_ids == chunk_id])
+            x, y, feature_shape = chunks[chunk_id]
+            features.append(expand_features(x[chunk_rows], feature_shape))
+            labels.append(np.asarray(y[chunk_rows]))
+        return (np.concatenate(features),
+                to_categorical(np.concatenate(labels).astype(int), num_classes))
+
+    def _generate(self, batch_size, num_classes, epoch=0):
+        chunks = self._load_chunks()
+        if not chunks:
+            return
+        chunk_ids = np.concatenate([np.full(len(y), i, dtype=np.intp)
+                                    for i, (x, y, feature_shape) in enumerate(chunks)])
+        rows = np.concatenate([np.arange(len(y), dtype=np.intp) for x, y, feature_shape in chunks])
+        order = np.random.RandomState(self.seed + epoch).permutation(len(rows))
+        for start in range(0, len(order) - batch_size + 1, batch_size):
+            batch = order[start:start + batch_size]
+            yield self._batch(chunk_ids[batch], rows[batch], num_classes)
+
+    def _produce(self, batches, stop, batch_size, num_classes):
+        try:
+            epoch = 0
+            while not stop.is_set():
+                for item in self._generate(batch_size, num_classes, epoch):
+                    while not stop.is_set():
+                        try:
+                            batches.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                    if stop.is_set():
+                        return
+                epoch += 1
+        except Exception as e:
+            batches.put(e)
 
     def generate(self, batch_size=128, num_classes=19 * 19):
-        while True:
-            for item in self._generate(batch_size, num_classes):
+        if self.get_num_samples() < batch_size:
+            raise ValueError('Fewer samples than one batch of %d' % batch_size)
+        batches = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce,
+                                    args=(batches, stop, batch_size, num_classes))
+        producer.daemon = True
+        producer.start()
+        try:
+            while True:
+                item = batches.get()
+                if isinstance(item, Exception):
+                    raise item
                 yield item
+        finally:
+            stop.set()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from dlgo.data.generator import DataGenerator
+from dlgo.data.streaming import ChunkWriter
+
+
+class DataGeneratorTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        # Two archives of 8 samples each; plane values encode the label.
+        for archive, offset in (('KGS-a', 0), ('KGS-b', 8)):
+            writer = ChunkWriter(os.path.join(self.data_dir, archive + 'train'), (2, 3, 3), chunk_size=4)
+            labels = np.arange(offset, offset + 8)
+            features = (labels[:, None, None, None] % 2) * np.ones((8, 2, 3, 3))
+            writer.add(features, labels)
+            writer.close()
+        self.samples = [('KGS-a.tar.gz', 0), ('KGS-b.tar.gz', 3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_epoch_visits_every_sample_once(self):
+        generator = DataGenerator(self.data_dir, self.samples)
+        self.assertEqual(16, generator.get_num_samples())
+        # Counted from the manifests, without mapping any chunk.
+        self.assertIsNone(generator._chunks)
+        seen = []
+        for x, y in generator._generate(batch_size=5, num_classes=16):
+            self.assertEqual((5, 2, 3, 3), x.shape)
+            self.assertEqual(np.float32, x.dtype)
+            labels = y.argmax(axis=1)
+            self.assertTrue(np.array_equal(labels % 2, x[:, 0, 0, 0]))
+            seen.extend(labels.tolist())
+        # Three full batches; one sample is left for the next epoch.
+        self.assertEqual(15, len(set(seen)))
+
+    def test_shuffle_depends_on_seed_and_epoch(self):
+        def first_labels(seed, epoch):
+            generator = DataGenerator(self.data_dir, self.samples, seed=seed)
+            x, y = next(generator._generate(8, 16, epoch))
+            return sorted(y.argmax(axis=1).tolist())
+
+        self.assertEqual(first_labels(1, 0), first_labels(1, 0))
+        self.assertNotEqual(first_labels(1, 0), first_labels(1, 1))
+
+    def test_prefetching_generator_runs_past_an_epoch(self):
+        generator = DataGenerator(self.data_dir, self.samples, prefetch=2)
+        batches = generator.generate(batch_size=4, num_classes=16)
+        labels = [next(batches)[1].argmax(axis=1) for _ in range(8)]
+        batches.close()
+        self.assertEqual(list(range(16)), sorted(np.concatenate(labels[:4]).tolist()))
+        self.assertEqual(list(range(16)), sorted(np.concatenate(labels[4:]).tolist()))
+
+    def test_chunks_without_manifest(self):
+        os.remove(os.path.join(self.data_dir, 'KGS-btrain'))
+        generator = DataGenerator(self.data_dir, self.samples)
+        self.assertEqual(16, generator.get_num_samples())
+
+
+if __name__ == '__main__':
+    unittest.main()
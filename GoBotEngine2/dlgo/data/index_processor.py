@@ -1,92 +1,139 @@
 from __future__ import print_function
 from __future__ import absolute_import
+import json
 import os
 import sys
-import multiprocessing
-import six
-if sys.version_info[0] == 3:
-    from urllib.request import urlopen, urlretrieve
-else:
-    from urllib import urlopen, urlretrieve
 
-
-def worker(url_and_target):
-    try:
-        (url, target_path) = url_and_target
-        print('>>> Downloading ' + target_path)
-        urlretrieve(url, target_path)
-    except (KeyboardInterrupt, SystemExit):
-        print('>>> Exiting child process')
+from dlgo.data.download import Downloader
 
 
 class KGSIndex:
+    """The KGS archives listed on the index page, and their download.
+
+    Archives are fetched by a Downloader with at most max_connections
+    downloads at a time. With mirror, a local directory or HTTP server
+    holding the index page and the archives under their own names, no
+    request goes to kgs_url.
+
+    The page is only read when file_info or urls are first used. Its
+    parsed form, each archive's url, filename, number of games and year,
+    is saved to kgs_index.json in the data directory and used instead of
+    the page while the page is unchanged, or when it is gone. Use
+    KGSIndex.shared to get one index per data directory for the whole
+    process.
+    """
+
+    _shared = {}
 
     def __init__(self,
                  kgs_url='http://u-go.net/gamerecords/',
                  index_page='kgs_index.html',
-                 data_directory='data'):
+                 data_directory='data',
+                 mirror=None,
+                 max_connections=4):
 
         self.kgs_url = kgs_url
         self.index_page = index_page
         self.data_directory = data_directory
-        self.file_info = []
-        self.urls = []
-        self.load_index()
+        self.index_file = os.path.join(data_directory, 'kgs_index.json')
+        self.downloader = Downloader(data_directory, max_connections=max_connections,
+                                     mirror=mirror)
+        self._file_info = None
 
-    def download_files(self):
-        if not os.path.isdir(self.data_directory):
-            os.makedirs(self.data_directory)
+    @classmethod
+    def shared(cls, data_directory='data', **kwargs):
+        """The KGSIndex of data_directory, built on first use and then reused."""
+        key = (data_directory, tuple(sorted(kwargs.items())))
+        if key not in cls._shared:
+            cls._shared[key] = cls(data_directory=data_directory, **kwargs)
+        return cls._shared[key]
+
+    @property
+    def file_info(self):
+        if self._file_info is None:
+            self.load_index()
+        return self._file_info
 
-        urls_to_download = []
-        for file_info in self.file_info:
-            url = file_info['url']
-            file_name = file_info['filename']
-            if not os.path.isfile(self.data_directory + '/' + file_name):
-                urls_to_download.append((url, self.data_directory + '/' + file_name))
-        cores = multiprocessing.cpu_count()
-        pool = multiprocessing.Pool(processes=cores)
+    @property
+    def urls(self):
+        return [file_info['url'] for file_info in self.file_info]
+
+    def download_files(self):
+        urls_and_names = [(file_info['url'], file_info['filename'])
+                          for file_info in self.file_info]
         try:
-            it = pool.imap(worker, urls_to_download)
-            for _ in it:
-                pass
-            pool.close()
-            pool.join()
+            self.downloader.download(urls_and_names)
         except KeyboardInterrupt:
-            print(">>> Caught KeyboardInterrupt, terminating workers")
-            pool.terminate()
-            pool.join()
+            print(">>> Caught KeyboardInterrupt, partial downloads are resumed next time")
             sys.exit(-1)
 
     def create_index_page(self):
         if os.path.isfile(self.index_page):
             print('>>> Reading cached index page')
-            index_file = open(self.index_page, 'r')
-            index_contents = index_file.read()
-            index_file.close()
         else:
             print('>>> Downloading index page')
-            fp = urlopen(self.kgs_url)
-            data = six.text_type(fp.read())
-            fp.close()
-            index_contents = data
-            index_file = open(self.index_page, 'w')
-            index_file.write(index_contents)
-            index_file.close()
+            self.downloader.fetch(self.kgs_url, self.index_page,
+                                  name=os.path.basename(self.index_page))
+        index_file = open(self.index_page, 'r')
+        index_contents = index_file.read()
+        index_file.close()
         return index_contents
 
+    def _page_stamp(self):
+        if not os.path.isfile(self.index_page):
+            return None
+        stat = os.stat(self.index_page)
+        return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+    def _load_saved(self):
+        try:
+            with open(self.index_file) as index_file:
+                saved = json.load(index_file)
+        except (IOError, OSError, ValueError):
+            return None
+        if not isinstance(saved, dict):
+            return None
+        stamp = self._page_stamp()
+        if stamp is not None and saved.get('page') != stamp:
+            return None
+        archives = saved.get('archives')
+        if not isinstance(archives, list):
+            # Older or hand-edited; parse the page again.
+            return None
+        return archives
+
+    def _save(self):
+        if not os.path.isdir(self.data_directory):
+            os.makedirs(self.data_directory)
+        temp_name = self.index_file + '.tmp.%d' % os.getpid()
+        with open(temp_name, 'w') as index_file:
+            json.dump({'page': self._page_stamp(), 'archives': self._file_info}, index_file,
+                      indent=1)
+        os.rename(temp_name, self.index_file)
+
     def load_index(self):
+        saved = self._load_saved()
+        if saved is not None:
+            self._file_info = saved
+            return
         index_contents = self.create_index_page()
         split_page = [item for item in index_contents.split('<a href="') if item.startswith("https://")]
+        urls = []
         for item in split_page:
             download_url = item.split('">Download')[0]
             if download_url.endswith('.tar.gz'):
-                self.urls.append(download_url)
-        for url in self.urls:
+                urls.append(download_url)
+        self._file_info = []
+        for url in urls:
             filename = os.path.basename(url)
             split_file_name = filename.split('-')
             num_games = int(split_file_name[len(split_file_name) - 2])
-            print(filename + ' ' + str(num_games))
-            self.file_info.append({'url': url, 'filename': filename, 'num_games': num_games})
+            year = int(split_file_name[1].split('_')[0])
+            self._file_info.append({'url': url, 'filename': filename, 'num_games': num_games,
+                                    'year': year})
+        print('>>> Indexed %d archives with %d games' %
+              (len(self._file_info), sum(info['num_games'] for info in self._file_info)))
+        self._save()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from dlgo.data.index_processor import KGSIndex
+
+PAGE = ''.join('<li><a href="https://u-go.net/gamerecords/%s">Download</a></li>\n' % name
+               for name in ('KGS-2001-19-3-.tar.gz', 'KGS-2016_01-19-1256-.tar.gz'))
+
+
+class KGSIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.index_page = os.path.join(self.data_dir, 'kgs_index.html')
+        with open(self.index_page, 'w') as page:
+            page.write(PAGE)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def index(self):
+        return KGSIndex(index_page=self.index_page, data_directory=self.data_dir,
+                        mirror=self.data_dir)
+
+    def test_page_is_parsed_once_and_saved(self):
+        index = self.index()
+        self.assertFalse(os.path.exists(index.index_file))
+        self.assertEqual([(3, 2001), (1256, 2016)],
+                         [(info['num_games'], info['year']) for info in index.file_info])
+        self.assertTrue(os.path.exists(index.index_file))
+
+        # Without the page, the saved index is used.
+        os.remove(self.index_page)
+        self.assertEqual(index.file_info, self.index().file_info)
+
+    def test_changed_page_is_parsed_again(self):
+        self.index().load_index()
+        with open(self.index_page, 'a') as page:
+            page.write('<a href="https://u-go.net/gamerecords/KGS-2002-19-5-.tar.gz">Download</a>')
+        self.assertEqual(['KGS-2001-19-3-.tar.gz', 'KGS-2016_01-19-1256-.tar.gz',
+                          'KGS-2002-19-5-.tar.gz'],
+                         [info['filename'] for info in self.index().file_info])
+
+    def test_saved_index_without_archives_is_parsed_again(self):
+        index = self.index()
+        for saved in ({'page': index._page_stamp()}, [], {'page': None, 'archives': None}):
+            with open(index.index_file, 'w') as index_file:
+                json.dump(saved, index_file)
+            self.assertEqual(2, len(self.index().file_info))
+
+    def test_shared_index(self):
+        first = KGSIndex.shared(data_directory=self.data_dir, index_page=self.index_page)
+        self.assertIs(first, KGSIndex.shared(data_directory=self.data_dir,
+                                             index_page=self.index_page))
+        self.assertIsNot(first, KGSIndex.shared(data_directory=self.data_dir + '/other',
+                                                index_page=self.index_page))
+
+
+if __name__ == '__main__':
+    unittest.main()
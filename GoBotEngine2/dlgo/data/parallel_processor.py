@@ -1,20 +1,17 @@
 from __future__ import print_function
 from __future__ import absolute_import
-import os
-import glob
-import os.path
-import tarfile
-import gzip
-import shutil
 import numpy as np
 import multiprocessing
 from os import sys
 from keras.utils import to_categorical
 
-from dlgo.gosgf import Sgf_game
-from dlgo.goboard_fast import Board, GameState, Move
-from dlgo.gotypes import Player, Point
+from dlgo.gosgf.sgf_grammar import parse_main_line
+from dlgo.data.archive import ArchiveIndex
+from dlgo.data.cache import GameCache
+from dlgo.data.compact import expand_features
 from dlgo.data.index_processor import KGSIndex
+from dlgo.data.streaming import ChunkWriter, chunk_files, encode_main_line, is_processed, \
+    merge_summaries
 from dlgo.data.sampling import Sampler
 from dlgo.data.generator import DataGenerator
 from dlgo.encoders.base import get_encoder_by_name
@@ -22,95 +19,89 @@ from dlgo.encoders.base import get_encoder_by_name
 
 def worker(jobinfo):
     try:
-        clazz, encoder, zip_file, data_file_name, game_list = jobinfo
-        clazz(encoder=encoder).process_zip(zip_file, data_file_name, game_list)
+        clazz, encoder, data_dir, zip_file, data_file_name, game_list = jobinfo
+        clazz(encoder=encoder, data_directory=data_dir).process_zip(
+            zip_file, data_file_name, game_list, keep_partial=True)
     except (KeyboardInterrupt, SystemExit):
         raise Exception('>>> Exiting child process.')
 
 
+def index_worker(archive_path):
+    try:
+        if ArchiveIndex.load(archive_path) is None:
+            ArchiveIndex.open(archive_path)
+    except (KeyboardInterrupt, SystemExit):
+        raise Exception('>>> Exiting child process.')
+
+
+def game_shards(game_list, num_shards):
+    """Split game_list, in archive order, into at most num_shards contiguous ranges."""
+    games = sorted(game_list)
+    shard_size = max(1, -(-len(games) // num_shards))
+    return [games[start:start + shard_size] for start in range(0, len(games), shard_size)]
+
+
 class GoDataProcessor:
-    def __init__(self, encoder='simple', data_directory='data'):
+    def __init__(self, encoder='simple', data_directory='data', mirror=None):
         self.encoder_string = encoder
         self.encoder = get_encoder_by_name(encoder, 19)
         self.data_dir = data_directory
+        self.cache_dir = data_directory + '/cache'
+        self.mirror = mirror
 
     def load_go_data(self, data_type='train', num_samples=1000,
-                     use_generator=False):
-        index = KGSIndex(data_directory=self.data_dir)
+                     use_generator=False, seed=1337, num_shards=1, shard_id=0):
+        """Draw, encode and return num_samples games of data_type.
+
+        With num_shards > 1 only shard shard_id of the draw is processed,
+        under data file names ending in <data_type>_<shard_id>of<num_shards>,
+        so nodes sharing a data directory do not overwrite each other.
+        """
+        index = KGSIndex.shared(data_directory=self.data_dir, mirror=self.mirror)
         index.download_files()
 
-        sampler = Sampler(data_dir=self.data_dir)
+        sampler = Sampler(data_dir=self.data_dir, seed=seed, num_shards=num_shards,
+                          shard_id=shard_id, index=index)
         data = sampler.draw_data(data_type, num_samples)
+        data_name = data_type if num_shards == 1 else \
+            '%s_%dof%d' % (data_type, shard_id, num_shards)
 
-        self.map_to_workers(data_type, data)
+        self.map_to_workers(data_name, data)
         if use_generator:
-            generator = DataGenerator(self.data_dir, data)
+            generator = DataGenerator(self.data_dir, data, data_name)
             return generator
         else:
-            features_and_labels = self.consolidate_games(data_type, data)
+            features_and_labels = self.consolidate_games(data_name, data)
             return features_and_labels
 
-    def unzip_data(self, zip_file_name):
-        this_gz = gzip.open(self.data_dir + '/' + zip_file_name)
-
-        tar_file = zip_file_name[0:-3]
-        this_tar = open(self.data_dir + '/' + tar_file, 'wb')
-
-        shutil.copyfileobj(this_gz, this_tar)
-        this_tar.close()
-        return tar_file
-
-    def process_zip(self, zip_file_name, data_file_name, game_list):
-        tar_file = self.unzip_data(zip_file_name)
-        zip_file = tarfile.open(self.data_dir + '/' + tar_file)
-        name_list = zip_file.getnames()
-        total_examples = self.num_total_examples(zip_file, game_list, name_list)
-
-        shape = self.encoder.shape()
-        feature_shape = np.insert(shape, 0, np.asarray([total_examples]))
-        features = np.zeros(feature_shape)
-        labels = np.zeros((total_examples,))
-
-        counter = 0
-        for index in game_list:
-            name = name_list[index + 1]
-            if not name.endswith('.sgf'):
-                raise ValueError(name + ' is not a valid sgf')
-            sgf_content = zip_file.extractfile(name).read()
-            sgf = Sgf_game.from_string(sgf_content)
-
-            game_state, first_move_done = self.get_handicap(sgf)
-
-            for item in sgf.main_sequence_iter():
-                color, move_tuple = item.get_move()
-                point = None
-                if color is not None:
-                    if move_tuple is not None:
-                        row, col = move_tuple
-                        point = Point(row + 1, col + 1)
-                        move = Move.play(point)
-                    else:
-                        move = Move.pass_turn()
-                    if first_move_done and point is not None:
-                        features[counter] = self.encoder.encode(game_state)
-                        labels[counter] = self.encoder.encode_point(point)
-                        counter += 1
-                    game_state = game_state.apply_move(move)
-                    first_move_done = True
-
-        feature_file_base = self.data_dir + '/' + data_file_name + '_features_%d'
-        label_file_base = self.data_dir + '/' + data_file_name + '_labels_%d'
-
-        chunk = 0
-        chunksize = 1024
-        while features.shape[0] >= chunksize:
-            feature_file = feature_file_base % chunk
-            label_file = label_file_base % chunk
-            chunk += 1
-            current_features, features = features[:chunksize], features[chunksize:]
-            current_labels, labels = labels[:chunksize], labels[chunksize:]
-            np.save(feature_file, current_features)
-            np.save(label_file, current_labels)
+    def process_zip(self, zip_file_name, data_file_name, game_list, keep_partial=False):
+        """Encode the games of game_list in one pass over the archive.
+
+        Each game is parsed once and its examples go straight to a
+        ChunkWriter, so memory is bounded by the chunk size rather than
+        by the number of games. The SGF files are read straight from the
+        compressed archive through its ArchiveIndex. Encoded games are
+        kept in a GameCache under the data directory, so only games not
+        encoded before are read and encoded. keep_partial is
+        passed on to the ChunkWriter.
+        """
+        # The first member of every KGS archive is its directory.
+        positions = [index + 1 for index in game_list]
+        writer = ChunkWriter(self.data_dir + '/' + data_file_name, self.encoder.shape(),
+                             keep_partial=keep_partial)
+
+        cache = GameCache(self.cache_dir, self.encoder)
+        games = cache.games(self.data_dir + '/' + zip_file_name, positions, self.encode_sgf)
+        for position, features, labels in games:
+            writer.add(features, labels)
+        writer.close(games=game_list, encoder=self.encoder)
+
+    def encode_sgf(self, name, sgf_content):
+        if not name.endswith('.sgf'):
+            raise ValueError(name + ' is not a valid sgf')
+        # Only the main line's moves and setup are used, so the SGF is not
+        # parsed into a full game tree.
+        return encode_main_line(self.encoder, parse_main_line(sgf_content))
 
     def consolidate_games(self, name, samples):
         files_needed = set(file_name for file_name, index in samples)
@@ -122,14 +113,9 @@ class GoDataProcessor:
         feature_list = []
         label_list = []
         for file_name in file_names:
-            file_prefix = file_name.replace('.tar.gz', '')
-            base = self.data_dir + '/' + file_prefix + '_features_*.npy'
-            for feature_file in glob.glob(base):
-                label_file = feature_file.replace('features', 'labels')
-                x = np.load(feature_file)
-                y = np.load(label_file)
-                x = x.astype('float32')
-                y = to_categorical(y.astype(int), 19 * 19)
+            for feature_file, label_file, feature_shape in chunk_files(self.data_dir, file_name):
+                x = expand_features(np.load(feature_file), feature_shape or self.encoder.shape())
+                y = to_categorical(np.load(label_file).astype(int), 19 * 19)
                 feature_list.append(x)
                 label_list.append(y)
 
@@ -144,65 +130,64 @@ class GoDataProcessor:
 
         return features, labels
 
-    @staticmethod
-    def get_handicap(sgf):
-        go_board = Board(19, 19)
-        first_move_done = False
-        move = None
-        game_state = GameState.new_game(19)
-        if sgf.get_handicap() is not None and sgf.get_handicap() != 0:
-            for setup in sgf.get_root().get_setup_stones():
-                for move in setup:
-                    row, col = move
-                    go_board.place_stone(Player.black, Point(row + 1, col + 1))
-            first_move_done = True
-            game_state = GameState(go_board, Player.white, None, move)
-        return game_state, first_move_done
-
-    def map_to_workers(self, data_type, samples):
-        zip_names = set()
+    def map_to_workers(self, data_type, samples, shards_per_core=4):
+        """Encode the sampled games on all cores and write one manifest per archive.
+
+        The games sampled from each archive are split into contiguous
+        ranges, about shards_per_core per core over all archives, so a few
+        large archives still keep every core busy. Each shard writes its
+        own chunks and summary, named <data file>_shard<k>; once all are
+        done they are merged into the data file's manifest. Data files and
+        shards already written for the same games and encoder are kept, and
+        games are read from the GameCache where they were encoded before,
+        so an interrupted run or a new sample picks up where earlier runs
+        stopped.
+        """
         indices_by_zip_name = {}
         for filename, index in samples:
-            zip_names.add(filename)
             if filename not in indices_by_zip_name:
                 indices_by_zip_name[filename] = []
             indices_by_zip_name[filename].append(index)
 
+        cores = multiprocessing.cpu_count()
+        total_games = sum(len(games) for games in indices_by_zip_name.values())
+        shard_size = max(1, -(-total_games // (cores * shards_per_core)))
+
         zips_to_process = []
-        for zip_name in zip_names:
+        shards_to_process = []
+        shards_by_data_file = {}
+        for zip_name in sorted(indices_by_zip_name):
             base_name = zip_name.replace('.tar.gz', '')
             data_file_name = base_name + data_type
-            if not os.path.isfile(self.data_dir + '/' + data_file_name):
-                zips_to_process.append((self.__class__, self.encoder_string, zip_name,
-                                        data_file_name, indices_by_zip_name[zip_name]))
-
-        cores = multiprocessing.cpu_count()
+            game_list = indices_by_zip_name[zip_name]
+            if is_processed(self.data_dir + '/' + data_file_name, game_list, self.encoder):
+                continue
+            shards = game_shards(game_list, -(-len(game_list) // shard_size))
+            shard_bases = []
+            for shard_id, shard in enumerate(shards):
+                shard_name = data_file_name + '_shard%d' % shard_id
+                shard_bases.append(self.data_dir + '/' + shard_name)
+                if not is_processed(self.data_dir + '/' + shard_name, shard, self.encoder):
+                    shards_to_process.append((self.__class__, self.encoder_string, self.data_dir,
+                                              zip_name, shard_name, shard))
+            shards_by_data_file[data_file_name] = (shard_bases, game_list)
+            zips_to_process.append(self.data_dir + '/' + zip_name)
+
+        if not shards_by_data_file:
+            return
         pool = multiprocessing.Pool(processes=cores)
-        p = pool.map_async(worker, zips_to_process)
         try:
-            _ = p.get()
+            # Index every archive first, so shards of one archive do not
+            # each stream it to build the same index.
+            pool.map_async(index_worker, zips_to_process).get()
+            pool.map_async(worker, shards_to_process, chunksize=1).get()
         except KeyboardInterrupt:
             pool.terminate()
             pool.join()
             sys.exit(-1)
+        pool.close()
+        pool.join()
 
-    def num_total_examples(self, zip_file, game_list, name_list):
-        total_examples = 0
-        for index in game_list:
-            name = name_list[index + 1]
-            if name.endswith('.sgf'):
-                sgf_content = zip_file.extractfile(name).read()
-                sgf = Sgf_game.from_string(sgf_content)
-                game_state, first_move_done = self.get_handicap(sgf)
-
-                num_moves = 0
-                for item in sgf.main_sequence_iter():
-                    color, move = item.get_move()
-                    if color is not None:
-                        if first_move_done:
-                            num_moves += 1
-                        first_move_done = True
-                total_examples = total_examples + num_moves
-            else:
-                raise ValueError(name + ' is not a valid sgf')
-        return total_examples
+        for data_file_name, (shard_bases, game_list) in shards_by_data_file.items():
+            merge_summaries(self.data_dir + '/' + data_file_name, shard_bases, games=game_list,
+                            encoder=self.encoder)
@@ -2,25 +2,102 @@ from __future__ import print_function
 from __future__ import absolute_import
 import os
 import random
+
+import numpy as np
+
 from dlgo.data.index_processor import KGSIndex
-from six.moves import range
+
+__all__ = [
+    'FeistelPermutation',
+    'Sampler',
+]
+
+
+class FeistelPermutation:
+    """A pseudo-random permutation of range(size), computed rather than stored.
+
+    A balanced Feistel network over the smallest even number of bits that
+    holds size - 1 is a bijection; values that land outside range(size)
+    are encrypted again until they fall inside (cycle walking). Positions
+    are mapped in numpy batches, so any slice of the permutation costs
+    time proportional to its length and no memory for the rest.
+    """
+
+    def __init__(self, size, seed, rounds=4):
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2) if size > 1 else 1
+        self.mask = np.uint64((1 << self.half_bits) - 1)
+        rng = random.Random(seed)
+        self.keys = [np.uint64(rng.getrandbits(64)) for _ in range(rounds)]
+
+    def _encrypt(self, values):
+        shift = np.uint64(self.half_bits)
+        left = values >> shift
+        right = values & self.mask
+        for key in self.keys:
+            mixed = (right ^ key) * np.uint64(0x9E3779B97F4A7C15)
+            mixed ^= mixed >> np.uint64(29)
+            left, right = right, left ^ (mixed & self.mask)
+        return (left << shift) | right
+
+    def __getitem__(self, positions):
+        """The permuted values at positions, an int or an array of ints in range(size)."""
+        values = self._encrypt(np.atleast_1d(np.asarray(positions, dtype=np.uint64)))
+        outside = values >= np.uint64(self.size)
+        while outside.any():
+            values[outside] = self._encrypt(values[outside])
+            outside = values >= np.uint64(self.size)
+        values = values.astype(np.int64)
+        return values if np.ndim(positions) else int(values[0])
 
 
 class Sampler:
-    def __init__(self, data_dir='data', num_test_games=100, cap_year=2015, seed=1337):
+    """Draw (archive filename, game index) samples from the KGS index.
+
+    Games of archives up to cap_year are numbered globally through the
+    archives' cumulative game counts, so a draw picks unique game ids
+    through a FeistelPermutation of that range and maps only the drawn ids
+    back to archives. Test games are excluded by their sorted ids.
+    No list of all games is built, and draws never retry.
+
+    Draws depend only on seed and on how many draws came before, and the
+    test split is stored in the data directory, so samplers on different
+    nodes agree without talking to each other. With num_shards > 1 every
+    draw returns only the games at positions shard_id, shard_id +
+    num_shards, ... of the full draw; the shards of one draw are disjoint
+    and together make the full draw.
+
+    Archives are read from index, a KGSIndex; by default the shared index
+    of data_dir.
+    """
+
+    def __init__(self, data_dir='data', num_test_games=100, cap_year=2015, seed=1337,
+                 num_shards=1, shard_id=0, index=None):
+        if not 0 <= shard_id < num_shards:
+            raise ValueError('shard_id must be in range(%d), got %d' % (num_shards, shard_id))
         self.data_dir = data_dir
         self.num_test_games = num_test_games
         self.test_games = []
         self.train_games = []
-        self.test_folder = 'test_samples.py'
+        self.test_folder = os.path.join(data_dir, 'test_samples.py')
         self.cap_year = cap_year
+        self.seed = seed
+        self.num_shards = num_shards
+        self.shard_id = shard_id
+        self.index = index
+        self._num_draws = 0
+        self._archives = None
+        self._test_ids = None
 
-        random.seed(seed)
         self.compute_test_samples()
 
+    def shard(self, samples):
+        """This sampler's share of samples."""
+        return samples[self.shard_id::self.num_shards]
+
     def draw_data(self, data_type, num_samples):
         if data_type == 'test':
-            return self.test_games
+            return self.shard(self.test_games)
         elif data_type == 'train' and num_samples is not None:
             return self.draw_training_samples(num_samples)
         elif data_type == 'train' and num_samples is None:
@@ -28,49 +105,116 @@ class Sampler:
         else:
             raise ValueError(data_type + " is not a valid data type, choose from 'train' or 'test'")
 
+    def archives(self):
+        """(filenames, offsets) of the archives up to cap_year.
+
+        Game i of archive k has the global id offsets[k] + i; the last
+        offset is the total number of games.
+        """
+        if self._archives is None:
+            index = self.index or KGSIndex.shared(data_directory=self.data_dir)
+            file_infos = [file_info for file_info in index.file_info
+                          if file_info['year'] <= self.cap_year and 'num_games' in file_info]
+            filenames = [file_info['filename'] for file_info in file_infos]
+            counts = [file_info['num_games'] for file_info in file_infos]
+            self._archives = (filenames, np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]))
+        return self._archives
+
+    def num_games(self):
+        return int(self.archives()[1][-1])
+
+    def game_ids(self, samples):
+        """Global ids of (filename, index) samples; samples outside the pool are left out."""
+        filenames, offsets = self.archives()
+        offset_by_name = dict(zip(filenames, offsets.tolist()))
+        return np.array(sorted(offset_by_name[filename] + index for filename, index in samples
+                               if filename in offset_by_name), dtype=np.int64)
+
+    def samples(self, ids):
+        """(filename, index) of each global game id."""
+        filenames, offsets = self.archives()
+        ids = np.asarray(ids, dtype=np.int64)
+        archive_ids = np.searchsorted(offsets, ids, side='right') - 1
+        indices = ids - offsets[archive_ids]
+        names = np.array(filenames, dtype=object)[archive_ids]
+        return list(zip(names.tolist(), indices.tolist()))
+
+    def test_ids(self):
+        if self._test_ids is None:
+            self._test_ids = self.game_ids(set(self.test_games))
+        return self._test_ids
+
+    def _permutation(self, kind):
+        self._num_draws += 1
+        return FeistelPermutation(self.num_games(),
+                                  '%d/%s/%d' % (self.seed, kind, self._num_draws))
+
+    def _id_blocks(self, permutation, exclude, block_size):
+        """Blocks of unique game ids in random order, without the ids in exclude."""
+        total = self.num_games()
+        for start in range(0, total, block_size):
+            ids = permutation[np.arange(start, min(total, start + block_size))]
+            if len(exclude):
+                ids = ids[~np.isin(ids, exclude)]
+            yield ids
+
+    def _draw_ids(self, permutation, num_sample_games, exclude):
+        available = self.num_games() - len(exclude)
+        if num_sample_games > available:
+            raise ValueError('Cannot draw %d games, only %d are available' %
+                             (num_sample_games, available))
+        drawn = []
+        num_drawn = 0
+        # At most len(exclude) ids of a block are excluded, so the first
+        # block is enough.
+        block_size = max(1024, num_sample_games + len(exclude))
+        if num_sample_games > 0:
+            for ids in self._id_blocks(permutation, exclude, block_size):
+                drawn.append(ids[:num_sample_games - num_drawn])
+                num_drawn += len(drawn[-1])
+                if num_drawn >= num_sample_games:
+                    break
+        return np.concatenate(drawn) if drawn else np.zeros(0, dtype=np.int64)
+
     def draw_samples(self, num_sample_games):
-        available_games = []
-        index = KGSIndex(data_directory=self.data_dir)
-
-        for fileinfo in index.file_info:
-            filename = fileinfo['filename']
-            year = int(filename.split('-')[1].split('_')[0])
-            if year > self.cap_year:
-                continue
-            num_games = fileinfo['num_games']
-            for i in range(num_games):
-                available_games.append((filename, i))
-        print('>>> Total number of games used: ' + str(len(available_games)))
-
-        sample_set = set()
-        while len(sample_set) < num_sample_games:
-            sample = random.choice(available_games)
-            if sample not in sample_set:
-                sample_set.add(sample)
+        """num_sample_games games of the whole pool, test games included; not sharded."""
+        # Drawn from its own permutation, so the test split does not
+        # depend on the draws made before it.
+        permutation = FeistelPermutation(self.num_games(), '%d/test' % self.seed)
+        ids = self._draw_ids(permutation, num_sample_games, np.zeros(0, dtype=np.int64))
+        print('>>> Total number of games used: ' + str(self.num_games()))
         print('Drawn ' + str(num_sample_games) + ' samples:')
-        return list(sample_set)
+        return self.samples(ids)
+
+    def stream_training_samples(self, block_size=1 << 16):
+        """Yield this shard's training games once each, in random order, as they are needed."""
+        position = 0
+        for ids in self._id_blocks(self._permutation('stream'), self.test_ids(), block_size):
+            first = (self.shard_id - position) % self.num_shards
+            position += len(ids)
+            for sample in self.samples(ids[first::self.num_shards]):
+                yield sample
 
     def draw_training_games(self):
-        index = KGSIndex(data_directory=self.data_dir)
-        for file_info in index.file_info:
-            filename = file_info['filename']
-            year = int(filename.split('-')[1].split('_')[0])
-            if year > self.cap_year:
-                continue
-            num_games = file_info['num_games']
-            for i in range(num_games):
-                sample = (filename, i)
-                if sample not in self.test_games:
-                    self.train_games.append(sample)
+        self.train_games.extend(self.draw_all_training())
         print('total num training games: ' + str(len(self.train_games)))
 
     def compute_test_samples(self):
+        legacy_folder = 'test_samples.py'
         if not os.path.isfile(self.test_folder):
-            test_games = self.draw_samples(self.num_test_games)
-            test_sample_file = open(self.test_folder, 'w')
-            for sample in test_games:
-                test_sample_file.write(str(sample) + "\n")
-            test_sample_file.close()
+            if os.path.isfile(legacy_folder):
+                # Older versions kept the split in the working directory.
+                with open(legacy_folder) as legacy_file:
+                    contents = legacy_file.read()
+            else:
+                contents = ''.join(str(sample) + "\n"
+                                   for sample in self.draw_samples(self.num_test_games))
+            if not os.path.isdir(self.data_dir):
+                os.makedirs(self.data_dir)
+            temp_name = self.test_folder + '.tmp.%d' % os.getpid()
+            with open(temp_name, 'w') as test_sample_file:
+                test_sample_file.write(contents)
+            os.rename(temp_name, self.test_folder)
 
         test_sample_file = open(self.test_folder, 'r')
         sample_contents = test_sample_file.read()
@@ -81,46 +225,14 @@ class Sampler:
                 self.test_games.append((filename, index))
 
     def draw_training_samples(self, num_sample_games):
-        available_games = []
-        index = KGSIndex(data_directory=self.data_dir)
-        for fileinfo in index.file_info:
-            filename = fileinfo['filename']
-            year = int(filename.split('-')[1].split('_')[0])
-            if year > self.cap_year:
-                continue
-            num_games = fileinfo['num_games']
-            for i in range(num_games):
-                available_games.append((filename, i))
-        print('total num games: ' + str(len(available_games)))
-
-        sample_set = set()
-        while len(sample_set) < num_sample_games:
-            sample = random.choice(available_games)
-            if sample not in self.test_games:
-                sample_set.add(sample)
+        ids = self._draw_ids(self._permutation('train'), num_sample_games, self.test_ids())
+        print('total num games: ' + str(self.num_games()))
         print('Drawn ' + str(num_sample_games) + ' samples:')
-        return list(sample_set)
+        return self.samples(self.shard(ids))
 
     def draw_all_training(self):
-        available_games = []
-        index = KGSIndex(data_directory=self.data_dir)
-
-        for fileinfo in index.file_info:
-            filename = fileinfo['filename']
-            year = int(filename.split('-')[1].split('_')[0])
-            if year > self.cap_year:
-                continue
-            if 'num_games' in fileinfo.keys():
-                num_games = fileinfo['num_games']
-            else:
-                continue
-            for i in range(num_games):
-                available_games.append((filename, i))
-        print('total num games: ' + str(len(available_games)))
-
-        sample_set = set()
-        for sample in available_games:
-            if sample not in self.test_games:
-                sample_set.add(sample)
-        print('Drawn all samples, ie ' + str(len(sample_set)) + ' samples:')
-        return list(sample_set)
+        ids = np.arange(self.num_games(), dtype=np.int64)
+        ids = ids[~np.isin(ids, self.test_ids())]
+        print('total num games: ' + str(self.num_games()))
+        print('Drawn all samples, ie ' + str(len(ids)) + ' samples:')
+        return self.samples(self.shard(ids))
@@ -0,0 +1,108 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from dlgo.data.sampling import FeistelPermutation, Sampler
+
+ARCHIVES = [('KGS-2001-19-30-.tar.gz', 30, 2001),
+            ('KGS-2002-19-50-.tar.gz', 50, 2002),
+            ('KGS-2016_01-19-40-.tar.gz', 40, 2016)]
+
+
+class FeistelPermutationTest(unittest.TestCase):
+    def test_is_a_permutation(self):
+        for size in (1, 2, 7, 64, 1000):
+            permutation = FeistelPermutation(size, seed=3)
+            self.assertEqual(list(range(size)), sorted(permutation[list(range(size))].tolist()))
+
+    def test_depends_on_seed_only(self):
+        positions = list(range(100))
+        self.assertEqual(FeistelPermutation(100, 5)[positions].tolist(),
+                         FeistelPermutation(100, 5)[positions].tolist())
+        self.assertNotEqual(FeistelPermutation(100, 5)[positions].tolist(),
+                            FeistelPermutation(100, 6)[positions].tolist())
+        self.assertEqual(FeistelPermutation(100, 5)[positions][17], FeistelPermutation(100, 5)[17])
+
+
+class SamplerTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.work_dir)
+        os.mkdir('data')
+        with open('data/kgs_index.json', 'w') as index_file:
+            json.dump({'page': None,
+                       'archives': [{'url': 'https://u-go.net/gamerecords/' + name,
+                                     'filename': name, 'num_games': num_games, 'year': year}
+                                    for name, num_games, year in ARCHIVES]}, index_file)
+        self.sampler = Sampler(num_test_games=10)
+        self.all_games = set((name, index) for name, num_games, year in ARCHIVES[:2]
+                             for index in range(num_games))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.work_dir)
+
+    def test_test_games_come_from_the_pool(self):
+        self.assertEqual(10, len(set(self.sampler.test_games)))
+        self.assertTrue(set(self.sampler.test_games) <= self.all_games)
+        self.assertTrue(os.path.isfile(os.path.join('data', 'test_samples.py')))
+        self.assertFalse(os.path.exists('test_samples.py'))
+
+    def test_training_samples_are_unique_and_not_test_games(self):
+        samples = self.sampler.draw_training_samples(25)
+        self.assertEqual(25, len(set(samples)))
+        self.assertTrue(set(samples) <= self.all_games - set(self.sampler.test_games))
+
+    def test_draw_every_training_game(self):
+        training = self.all_games - set(self.sampler.test_games)
+        self.assertEqual(training, set(self.sampler.draw_training_samples(len(training))))
+        self.assertEqual(training, set(self.sampler.draw_all_training()))
+        with self.assertRaises(ValueError):
+            self.sampler.draw_training_samples(len(training) + 1)
+
+    def test_stream_yields_each_training_game_once(self):
+        streamed = list(self.sampler.stream_training_samples(block_size=16))
+        self.assertEqual(len(streamed), len(set(streamed)))
+        self.assertEqual(self.all_games - set(self.sampler.test_games), set(streamed))
+
+    def test_draws_depend_on_seed_only(self):
+        state = random.getstate()
+        os.remove(os.path.join('data', 'test_samples.py'))
+        other = Sampler(num_test_games=10)
+        self.assertEqual(self.sampler.test_games, other.test_games)
+        self.assertEqual(self.sampler.draw_training_samples(20), other.draw_training_samples(20))
+        self.assertEqual(state, random.getstate())
+
+    def test_shards_split_the_full_draw(self):
+        full = Sampler(num_test_games=10).draw_training_samples(25)
+        shards = [Sampler(num_test_games=10, num_shards=3, shard_id=shard_id)
+                  for shard_id in range(3)]
+        drawn = [shard.draw_training_samples(25) for shard in shards]
+        self.assertEqual([9, 8, 8], [len(samples) for samples in drawn])
+        self.assertEqual(sorted(full), sorted(sum(drawn, [])))
+        self.assertEqual(sorted(self.sampler.test_games),
+                         sorted(sum([shard.draw_data('test', None) for shard in shards], [])))
+
+        streamed = [list(shard.stream_training_samples(block_size=16)) for shard in shards]
+        self.assertEqual(self.all_games - set(self.sampler.test_games), set(sum(streamed, [])))
+        self.assertEqual(len(self.all_games) - 10, sum(len(samples) for samples in streamed))
+
+    def test_given_index_is_used(self):
+        index = SimpleNamespace(file_info=[{'filename': 'KGS-x.tar.gz', 'num_games': 20,
+                                            'year': 2001}])
+        sampler = Sampler(data_dir='other', num_test_games=5, index=index)
+        self.assertEqual({'KGS-x.tar.gz'}, set(name for name, _ in sampler.test_games))
+        self.assertEqual(15, len(sampler.draw_all_training()))
+
+    def test_shard_id_must_be_in_range(self):
+        with self.assertRaises(ValueError):
+            Sampler(num_test_games=10, num_shards=2, shard_id=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
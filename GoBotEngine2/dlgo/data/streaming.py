@@ -0,0 +1,202 @@
+from __future__ import absolute_import
+import glob
+import json
+import os
+
+import numpy as np
+
+from dlgo.data.compact import compact_features, compact_labels
+from dlgo.goboard_array import Board, GameState, Move
+from dlgo.gotypes import Player, Point
+
+__all__ = [
+    'ChunkWriter',
+    'chunk_files',
+    'encode_main_line',
+    'encoder_key',
+    'is_processed',
+    'merge_summaries',
+    'read_summary',
+]
+
+
+def encode_main_line(encoder, main_line):
+    """Encode every position of a Main_line that has a move to learn.
+
+    main_line comes from sgf_grammar.parse_main_line. With a handicap,
+    every setup stone is black and white moves first; without one, the
+    first move is played but not learned from. Passes are never learned
+    from. Returns (features, labels) where labels holds
+    encoder.encode_point of the move played.
+    """
+    first_move_done = False
+    game_state = GameState.new_game(19)
+    if main_line.handicap is not None:
+        board = Board(19, 19)
+        point = None
+        for point in main_line.setup_black + main_line.setup_white:
+            board.place_stone(Player.black, Point(point[0] + 1, point[1] + 1))
+        first_move_done = True
+        game_state = GameState(board, Player.white, None, point)
+
+    game_states = []
+    labels = []
+    for colour, row, col in main_line.moves.tolist():
+        if row < 0:
+            move = Move.pass_turn()
+        else:
+            point = Point(row + 1, col + 1)
+            move = Move.play(point)
+            if first_move_done:
+                game_states.append(game_state)
+                labels.append(encoder.encode_point(point))
+        game_state = game_state.apply_move(move)
+        first_move_done = True
+    return encoder.encode_many(game_states), np.array(labels, dtype=np.float64)
+
+
+def encoder_key(encoder):
+    """Name, version and shape of encoder, e.g. 'sevenplane-v1-7x19x19'."""
+    return '%s-v%d-%s' % (encoder.name(), encoder.version(),
+                          'x'.join(str(dim) for dim in encoder.shape()))
+
+
+class ChunkWriter:
+    """Write (feature, label) examples to disk in chunks as they come in.
+
+    Examples are copied into one chunk_size buffer, and every full buffer
+    is saved as file_base_features_<n>.npy and file_base_labels_<n>.npy, so
+    memory does not grow with the number of examples. As before, a last
+    chunk with fewer than chunk_size examples is dropped unless
+    keep_partial is set.
+
+    Features are saved with compact_features and labels as int16 move
+    indices; use expand_features and to_categorical when loading them.
+
+    close() writes a small JSON summary to file_base itself, which marks
+    the data file as done. It is the data file's manifest: the feature
+    shape and, under 'chunks', each chunk's feature and label file names
+    (relative to the data directory) with its number of samples. The
+    game indices passed to close() are kept under 'games', and the
+    encoder_key of its encoder under 'encoder'.
+    """
+
+    def __init__(self, file_base, feature_shape, chunk_size=1024, keep_partial=False):
+        self.file_base = file_base
+        self.chunk_size = chunk_size
+        self.keep_partial = keep_partial
+        self.feature_shape = tuple(feature_shape)
+        self.features = np.zeros((chunk_size,) + self.feature_shape)
+        self.labels = np.zeros((chunk_size,))
+        self.num_buffered = 0
+        self.num_chunks = 0
+        self.chunks = []
+
+    def add(self, features, labels):
+        start = 0
+        while start < len(features):
+            end = min(len(features), start + self.chunk_size - self.num_buffered)
+            count = end - start
+            self.features[self.num_buffered:self.num_buffered + count] = features[start:end]
+            self.labels[self.num_buffered:self.num_buffered + count] = labels[start:end]
+            self.num_buffered += count
+            start = end
+            if self.num_buffered == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        count = self.num_buffered
+        feature_file = self.file_base + '_features_%d.npy' % self.num_chunks
+        label_file = self.file_base + '_labels_%d.npy' % self.num_chunks
+        np.save(feature_file, compact_features(self.features[:count]))
+        np.save(label_file, compact_labels(self.labels[:count]))
+        self.chunks.append({'features': os.path.basename(feature_file),
+                            'labels': os.path.basename(label_file),
+                            'num_samples': count})
+        self.num_chunks += 1
+        self.num_buffered = 0
+
+    def close(self, games=None, encoder=None):
+        if self.keep_partial and self.num_buffered:
+            self.flush()
+        summary = {
+            'num_chunks': self.num_chunks,
+            'chunk_size': self.chunk_size,
+            'num_examples': sum(chunk['num_samples'] for chunk in self.chunks),
+            'num_dropped': self.num_buffered,
+            'feature_shape': list(self.feature_shape),
+            'chunks': self.chunks}
+        if games is not None:
+            summary['games'] = sorted(games)
+        if encoder is not None:
+            summary['encoder'] = encoder_key(encoder)
+        write_summary(self.file_base, summary)
+        self.num_buffered = 0
+
+
+def write_summary(file_base, summary):
+    # Written under a temporary name first so that a summary, which marks
+    # the data as done, is never seen half-written.
+    temp_name = file_base + '.tmp.%d' % os.getpid()
+    with open(temp_name, 'w') as summary_file:
+        json.dump(summary, summary_file)
+    os.rename(temp_name, file_base)
+
+
+def read_summary(file_base):
+    """The summary ChunkWriter.close wrote for file_base, or None."""
+    try:
+        with open(file_base) as summary:
+            return json.load(summary)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def is_processed(file_base, games, encoder=None):
+    """Whether file_base has a summary written for exactly these games.
+
+    With encoder, the games must also have been encoded by an encoder
+    with the same encoder_key.
+    """
+    summary = read_summary(file_base)
+    if summary is None or summary.get('games') != sorted(games):
+        return False
+    return encoder is None or summary.get('encoder') == encoder_key(encoder)
+
+
+def merge_summaries(file_base, shard_bases, games=None, encoder=None):
+    """Write the summary of file_base as the union of its shards' summaries."""
+    shards = [read_summary(shard_base) for shard_base in shard_bases]
+    if any(shard is None for shard in shards):
+        raise ValueError('Cannot merge %s, a shard is unfinished' % file_base)
+    chunks = [chunk for shard in shards for chunk in shard['chunks']]
+    summary = {
+        'num_chunks': len(chunks),
+        'chunk_size': max(shard['chunk_size'] for shard in shards),
+        'num_examples': sum(shard['num_examples'] for shard in shards),
+        'num_dropped': sum(shard['num_dropped'] for shard in shards),
+        'feature_shape': shards[0]['feature_shape'],
+        'chunks': chunks,
+        'shards': [os.path.basename(shard_base) for shard_base in shard_bases]}
+    if games is not None:
+        summary['games'] = sorted(games)
+    if encoder is not None:
+        summary['encoder'] = encoder_key(encoder)
+    write_summary(file_base, summary)
+
+
+def chunk_files(data_dir, file_name):
+    """[(feature_file, label_file, feature_shape)] of a processed data file.
+
+    Read from the data file's summary; for data processed before
+    summaries listed their chunks, the chunk files are globbed and
+    feature_shape is None.
+    """
+    summary = read_summary(data_dir + '/' + file_name)
+    if summary is not None and 'chunks' in summary:
+        feature_shape = tuple(summary['feature_shape'])
+        return [(data_dir + '/' + chunk['features'], data_dir + '/' + chunk['labels'], feature_shape)
+                for chunk in summary['chunks']]
+    base = data_dir + '/' + file_name + '_features_*.npy'
+    return [(feature_file, feature_file.replace('features', 'labels'), None)
+            for feature_file in sorted(glob.glob(base))]
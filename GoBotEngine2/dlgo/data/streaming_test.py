@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from dlgo.data.streaming import ChunkWriter, chunk_files, encode_main_line, is_processed, \
+    merge_summaries
+from dlgo.encoders.oneplane import OnePlaneEncoder
+from dlgo.encoders.sevenplane import SevenPlaneEncoder
+from dlgo.gosgf.sgf_grammar import parse_main_line
+
+
+class ChunkWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_chunks_fill_across_games(self):
+        file_base = os.path.join(self.data_dir, 'archivetrain')
+        writer = ChunkWriter(file_base, (1, 2, 2), chunk_size=4)
+        for start in (0, 3, 6):
+            features = np.arange(start, start + 3).reshape(3, 1, 1, 1) * np.ones((3, 1, 2, 2))
+            writer.add(features, np.arange(start, start + 3))
+        writer.close()
+
+        for chunk in range(2):
+            labels = np.load(file_base + '_labels_%d.npy' % chunk)
+            features = np.load(file_base + '_features_%d.npy' % chunk)
+            self.assertEqual(list(range(4 * chunk, 4 * chunk + 4)), labels.tolist())
+            self.assertEqual(labels.tolist(), features[:, 0, 0, 0].tolist())
+        self.assertFalse(os.path.exists(file_base + '_labels_2.npy'))
+        with open(file_base) as summary:
+            summary = json.load(summary)
+        self.assertEqual(8, summary['num_examples'])
+        self.assertEqual(1, summary['num_dropped'])
+        self.assertEqual([1, 2, 2], summary['feature_shape'])
+        self.assertEqual([{'features': 'archivetrain_features_1.npy',
+                           'labels': 'archivetrain_labels_1.npy', 'num_samples': 4}],
+                         summary['chunks'][1:])
+
+    def test_keep_partial_saves_the_tail(self):
+        file_base = os.path.join(self.data_dir, 'archivetrain_shard0')
+        writer = ChunkWriter(file_base, (1, 2, 2), chunk_size=4, keep_partial=True)
+        writer.add(np.ones((6, 1, 2, 2)), np.arange(6))
+        writer.close()
+        self.assertEqual([4, 5], np.load(file_base + '_labels_1.npy').tolist())
+        with open(file_base) as summary:
+            summary = json.load(summary)
+        self.assertEqual(6, summary['num_examples'])
+        self.assertEqual(0, summary['num_dropped'])
+
+    def test_merge_shards_into_manifest(self):
+        shard_bases = []
+        for shard_id, count in enumerate((5, 3)):
+            shard_base = os.path.join(self.data_dir, 'archivetrain_shard%d' % shard_id)
+            writer = ChunkWriter(shard_base, (1, 2, 2), chunk_size=4, keep_partial=True)
+            writer.add(np.ones((count, 1, 2, 2)), np.arange(count))
+            writer.close()
+            shard_bases.append(shard_base)
+        merge_summaries(os.path.join(self.data_dir, 'archivetrain'), shard_bases)
+
+        files = chunk_files(self.data_dir, 'archivetrain')
+        self.assertEqual([4, 1, 3], [len(np.load(label_file)) for _, label_file, _ in files])
+        self.assertEqual({(1, 2, 2)}, set(shape for _, _, shape in files))
+        with open(os.path.join(self.data_dir, 'archivetrain')) as summary:
+            self.assertEqual(8, json.load(summary)['num_examples'])
+
+    def test_processed_only_for_the_same_games_and_encoder(self):
+        encoder = SevenPlaneEncoder((19, 19))
+        file_base = os.path.join(self.data_dir, 'archivetrain')
+        writer = ChunkWriter(file_base, encoder.shape())
+        writer.close(games=[3, 1], encoder=encoder)
+        self.assertTrue(is_processed(file_base, [1, 3], encoder))
+        self.assertFalse(is_processed(file_base, [1, 2], encoder))
+        self.assertFalse(is_processed(file_base, [1, 3], OnePlaneEncoder((19, 19))))
+
+        merge_summaries(file_base + 'all', [file_base], games=[1, 3],
+                        encoder=OnePlaneEncoder((19, 19)))
+        self.assertTrue(is_processed(file_base + 'all', [1, 3], OnePlaneEncoder((19, 19))))
+        self.assertFalse(is_processed(file_base + 'all', [1, 3], encoder))
+
+    def test_merge_needs_every_shard(self):
+        with self.assertRaises(ValueError):
+            merge_summaries(os.path.join(self.data_dir, 'archivetrain'),
+                            [os.path.join(self.data_dir, 'archivetrain_shard0')])
+
+
+class EncodeMainLineTest(unittest.TestCase):
+    def test_examples_follow_the_game(self):
+        main_line = parse_main_line(b'(;GM[1]FF[4]SZ[19];B[aa];W[];B[bb])')
+        features, labels = encode_main_line(OnePlaneEncoder((19, 19)), main_line)
+        # The first move and the pass are not learned from.
+        self.assertEqual(1, len(features))
+        # SGF rows count from the top: bb is row 18, column 2.
+        self.assertEqual([17 * 19 + 1], labels.tolist())
+        self.assertEqual(1, features[0].sum())
+
+    def test_handicap_stones_are_black_and_white_starts(self):
+        main_line = parse_main_line(b'(;SZ[19]HA[2]AB[dd][pp];W[tt];B[ab];W[cd](;B[ee])(;B[ff]))')
+        features, labels = encode_main_line(OnePlaneEncoder((19, 19)), main_line)
+        # The setup stands in for the first move; only the pass is skipped.
+        self.assertEqual([17 * 19, 15 * 19 + 2, 14 * 19 + 4], labels.tolist())
+        self.assertEqual([2, -3, 2], [int(feature.sum()) for feature in features])
+
+
+if __name__ == '__main__':
+    unittest.main()
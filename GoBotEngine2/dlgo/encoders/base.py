@@ -1,5 +1,8 @@
 import importlib
 
+import numpy as np
+
+from dlgo import goboard_array
 
 __all__ = [
     'Encoder',
@@ -11,9 +14,25 @@ class Encoder:
     def name(self):
         raise NotImplementedError()
 
+    def version(self):
+        """Bump in a subclass whenever its encodings change, so cached ones are redone."""
+        return 1
+
     def encode(self, game_state):
         raise NotImplementedError()
 
+    def encode_many(self, game_states, out=None):
+        """Encode a sequence of game states into one (N,) + shape() tensor.
+
+        out, if given, must hold exactly len(game_states) encodings and is
+        filled in place so callers can reuse one preallocated buffer.
+        """
+        if out is None:
+            out = np.zeros((len(game_states),) + tuple(self.shape()))
+        for i, game_state in enumerate(game_states):
+            out[i] = self.encode(game_state)
+        return out
+
     def encode_point(self, point):
         raise NotImplementedError()
 
@@ -27,6 +46,13 @@ class Encoder:
         raise NotImplementedError()
 
 
+def array_board(board):
+    """board as a goboard_array.Board, copying boards of other backends."""
+    if isinstance(board, goboard_array.Board):
+        return board
+    return goboard_array.copy_board(board)
+
+
 def get_encoder_by_name(name, board_size):
     if isinstance(board_size, int):
         board_size = (board_size, board_size)
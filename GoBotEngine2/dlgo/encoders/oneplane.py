@@ -1,6 +1,6 @@
 import numpy as np
 
-from dlgo.encoders.base import Encoder
+from dlgo.encoders.base import Encoder, array_board
 from dlgo.goboard import Point
 
 
@@ -15,19 +15,23 @@ class OnePlaneEncoder(Encoder):
 
     def encode(self, game_state):
         board_matrix = np.zeros(self.shape())
-        next_player = game_state.next_player
-        for r in range(self.board_height):
-            for c in range(self.board_width):
-                p = Point(row=r + 1, col=c + 1)
-                go_string = game_state.board.get_go_string(p)
-                if go_string is None:
-                    continue
-                if go_string.color == next_player:
-                    board_matrix[0, r, c] = 1
-                else:
-                    board_matrix[0, r, c] = -1
+        self.encode_many([game_state], board_matrix[np.newaxis])
         return board_matrix
 
+    def encode_many(self, game_states, out=None):
+        if out is None:
+            out = np.zeros((len(game_states),) + self.shape())
+        if not game_states:
+            return out
+        colors = np.stack([array_board(game_state.board).color_grid()[1:-1, 1:-1]
+                           for game_state in game_states])
+        next_player = np.array([game_state.next_player.value for game_state in game_states],
+                               dtype=np.int8)[:, np.newaxis, np.newaxis]
+        ours = colors == next_player
+        theirs = (colors != 0) & ~ours
+        out[:, 0] = ours.astype(np.int8) - theirs
+        return out
+
     def encode_point(self, point):
         return self.board_width * (point.row - 1) + (point.col - 1)
 
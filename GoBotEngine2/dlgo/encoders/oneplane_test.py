@@ -0,0 +1,26 @@
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_array, goboard_fast
+from dlgo.encoders.oneplane import OnePlaneEncoder
+from dlgo.gotypes import Point
+
+
+class OnePlaneEncoderTest(unittest.TestCase):
+    def test_encode_many_fills_buffer(self):
+        encoder = OnePlaneEncoder((5, 5))
+        states = [goboard_array.GameState.new_game(5), goboard_fast.GameState.new_game(5)]
+        states = [state.apply_move(goboard_array.Move.play(Point(2, 3))) for state in states]
+        out = np.ones((2,) + encoder.shape())
+        encoder.encode_many(states, out)
+        expected = np.zeros(encoder.shape())
+        # White to move, so black's stone is the opponent's.
+        expected[0, 1, 2] = -1
+        self.assertTrue(np.array_equal(expected, out[0]))
+        self.assertTrue(np.array_equal(expected, out[1]))
+        self.assertTrue(np.array_equal(expected, encoder.encode(states[0])))
+
+
+if __name__ == '__main__':
+    unittest.main()
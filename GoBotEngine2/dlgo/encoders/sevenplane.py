@@ -1,10 +1,28 @@
 import numpy as np
 
-from dlgo.encoders.base import Encoder
+from dlgo.encoders.base import Encoder, array_board
 from dlgo.goboard import Move, Point
 
 
+def ko_plane(game_state, board):
+    """Empty points where the next player's move would violate ko."""
+    player = game_state.next_player
+    if board is game_state.board:
+        return board.ko_mask(player, game_state.previous_states)
+    # Boards of other backends hash differently, so ask the game state
+    # about the few points where a ko is possible at all.
+    ko = board.capture_mask(player)
+    for row, col in zip(*np.nonzero(ko)):
+        point = Point(row=int(row) + 1, col=int(col) + 1)
+        ko[row, col] = game_state.does_move_violate_ko(player, Move.play(point))
+    return ko
+
+
 class SevenPlaneEncoder(Encoder):
+    """Planes 0-2 hold the next player's stones with 1, 2 and 3+
+    liberties, planes 3-5 the opponent's, and plane 6 the points the next
+    player may not play because of ko."""
+
     def __init__(self, board_size):
         self.board_width, self.board_height = board_size
         self.num_planes = 7
@@ -14,22 +32,33 @@ class SevenPlaneEncoder(Encoder):
 
     def encode(self, game_state):
         board_tensor = np.zeros(self.shape())
-        base_plane = {game_state.next_player: 0,
-                      game_state.next_player.other: 3}
-        for row in range(self.board_height):
-            for col in range(self.board_width):
-                p = Point(row=row + 1, col=col + 1)
-                go_string = game_state.board.get_go_string(p)
-                if go_string is None:
-                    if game_state.does_move_violate_ko(game_state.next_player,
-                                                       Move.play(p)):
-                        board_tensor[6][row][col] = 1
-                else:
-                    liberty_plane = min(3, go_string.num_liberties) - 1
-                    liberty_plane += base_plane[go_string.color]
-                    board_tensor[liberty_plane][row][col] = 1
+        self.encode_many([game_state], board_tensor[np.newaxis])
         return board_tensor
 
+    def encode_many(self, game_states, out=None):
+        if out is None:
+            out = np.zeros((len(game_states),) + self.shape())
+        if not game_states:
+            return out
+        colors = []
+        liberties = []
+        for i, game_state in enumerate(game_states):
+            board = array_board(game_state.board)
+            colors.append(board.color_grid()[1:-1, 1:-1])
+            liberties.append(board.liberty_grid()[1:-1, 1:-1])
+            out[i, 6] = ko_plane(game_state, board)
+        colors = np.stack(colors)
+        liberties = np.minimum(np.stack(liberties), 3)
+        next_player = np.array([game_state.next_player.value for game_state in game_states],
+                               dtype=np.int8)[:, np.newaxis, np.newaxis]
+        ours = colors == next_player
+        theirs = (colors != 0) & ~ours
+        for num_liberties in range(1, 4):
+            with_liberties = liberties == num_liberties
+            out[:, num_liberties - 1] = ours & with_liberties
+            out[:, num_liberties + 2] = theirs & with_liberties
+        return out
+
     def encode_point(self, point):
         return self.board_width * (point.row - 1) + (point.col - 1)
 
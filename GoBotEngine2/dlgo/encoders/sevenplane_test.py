@@ -0,0 +1,52 @@
+import random
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_array, goboard_fast
+from dlgo.encoders.sevenplane import SevenPlaneEncoder
+from dlgo.gotypes import Point
+
+
+def play(game, *points):
+    for row, col in points:
+        game = game.apply_move(goboard_array.Move.play(Point(row, col)))
+    return game
+
+
+class SevenPlaneEncoderTest(unittest.TestCase):
+    def test_liberty_and_ko_planes(self):
+        # Black captures at (2, 3); white may not retake at (2, 2) at once.
+        encoder = SevenPlaneEncoder((5, 5))
+        game = play(goboard_array.GameState.new_game(5),
+                    (1, 2), (1, 3), (2, 1), (2, 4), (3, 2), (3, 3), (5, 5), (2, 2), (2, 3))
+        planes = encoder.encode(game)
+        self.assertEqual(1, planes[6].sum())
+        self.assertEqual(1, planes[6, 1, 1])
+        # White to move: black's stone at (2, 3) is in atari.
+        self.assertEqual(1, planes[3, 1, 2])
+        self.assertEqual(0, planes[:6, 1, 1].sum())
+
+    def test_backends_and_batches_agree(self):
+        random.seed(5)
+        fast = goboard_fast.GameState.new_game(9)
+        array = goboard_array.GameState.new_game(9)
+        fast_states = []
+        array_states = []
+        for _ in range(60):
+            move = random.choice(array.legal_moves()[:-1])
+            fast_states.append(fast)
+            array_states.append(array)
+            fast = fast.apply_move(move)
+            array = array.apply_move(move)
+        encoder = SevenPlaneEncoder((9, 9))
+        out = np.full((len(array_states),) + encoder.shape(), 5.0)
+        encoder.encode_many(array_states, out)
+        for i, (fast_state, array_state) in enumerate(zip(fast_states, array_states)):
+            expected = encoder.encode(fast_state)
+            self.assertTrue(np.array_equal(expected, encoder.encode(array_state)))
+            self.assertTrue(np.array_equal(expected, out[i]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,645 @@
+import copy
+from array import array
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo import zobrist
+from dlgo.goboard_fast import GoString, Move
+from dlgo.gotypes import Player, Point
+from dlgo.scoring import compute_game_result
+
+__all__ = [
+    'Board',
+    'GameState',
+    'Move',
+    'SearchState',
+]
+
+# Cell values of the color array. Stones use Player.value so that
+# converting between the two is a tuple lookup.
+EMPTY = 0
+BLACK = Player.black.value
+WHITE = Player.white.value
+OFF_BOARD = 3
+
+COLOR_TO_PLAYER = (None, Player.black, Player.white, None)
+
+geometry_tables = {}
+
+
+class Geometry:
+    """Index tables shared by every board of one size.
+
+    Points are laid out row by row in a 1-D array with a one cell border
+    on every side, so the neighbors of index i are always i - stride,
+    i + stride, i - 1 and i + 1 and never need a bounds check.
+    """
+
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.stride = num_cols + 2
+        self.size = (num_rows + 2) * self.stride
+        self.points = [None] * self.size
+        self.index = {}
+        # Board indices in row-major order, matching flattened masks.
+        self.on_board = []
+        self.empty_colors = array('b', [OFF_BOARD]) * self.size
+        hash_black = [0] * self.size
+        hash_white = [0] * self.size
+        for r in range(1, num_rows + 1):
+            for c in range(1, num_cols + 1):
+                i = r * self.stride + c
+                p = Point(row=r, col=c)
+                self.points[i] = p
+                self.index[p] = i
+                self.on_board.append(i)
+                self.empty_colors[i] = EMPTY
+                # Same codes as goboard_fast, so hashes agree across backends.
+                empty_code = zobrist.HASH_CODE[p, None]
+                hash_black[i] = empty_code ^ zobrist.HASH_CODE[p, Player.black]
+                hash_white[i] = empty_code ^ zobrist.HASH_CODE[p, Player.white]
+        self.hash_codes = (None, hash_black, hash_white)
+
+
+def get_geometry(dim):
+    if dim not in geometry_tables:
+        geometry_tables[dim] = Geometry(*dim)
+    return geometry_tables[dim]
+
+
+def _any_neighbor(cells):
+    """For each point inside the border, whether any of its neighbors is set."""
+    return cells[:-2, 1:-1] | cells[2:, 1:-1] | cells[1:-1, :-2] | cells[1:-1, 2:]
+
+
+class Board:
+    """Go board stored in flat arrays instead of a dict of GoStrings.
+
+    Every stone carries the index of its string's root in _string_id, and
+    the stones of a string form a circular list through _next_stone. Stone
+    and liberty counts are only kept up to date at the root.
+
+    The board also keeps running totals of the stones on the board and the
+    stones captured by each color, for evaluators that must not scan it.
+    """
+
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self._geometry = get_geometry((num_rows, num_cols))
+        size = self._geometry.size
+        self._colors = array('b', self._geometry.empty_colors)
+        self._string_id = array('i', [0]) * size
+        self._next_stone = array('i', [0]) * size
+        self._num_stones = array('i', [0]) * size
+        self._num_liberties = array('i', [0]) * size
+        self._hash = zobrist.EMPTY_BOARD
+        # Indexed by color value; slot 0 is unused.
+        self._stone_counts = [0, 0, 0]
+        self._capture_counts = [0, 0, 0]
+
+        dim = (num_rows, num_cols)
+        if dim not in goboard_fast.neighbor_tables:
+            goboard_fast.init_neighbor_table(dim)
+        if dim not in goboard_fast.corner_tables:
+            goboard_fast.init_corner_table(dim)
+        self.neighbor_table = goboard_fast.neighbor_tables[dim]
+        self.corner_table = goboard_fast.corner_tables[dim]
+
+    def neighbors(self, point):
+        return self.neighbor_table[point]
+
+    def corners(self, point):
+        return self.corner_table[point]
+
+    def place_stone(self, player, point):
+        """Place a stone and return the undo entry that reverts it."""
+        assert self.is_on_grid(point)
+        index = self._geometry.index[point]
+        if self._colors[index] != EMPTY:
+            print('Illegal play on %s' % str(point))
+        assert self._colors[index] == EMPTY
+        return self._place(player.value, index)
+
+    def _place(self, color, index):
+        colors = self._colors
+        string_id = self._string_id
+        next_stone = self._next_stone
+        num_stones = self._num_stones
+        num_liberties = self._num_liberties
+        stride = self._geometry.stride
+
+        liberties = 0
+        adjacent_same_color = []
+        adjacent_opposite_color = []
+        for neighbor in (index - stride, index + stride, index - 1, index + 1):
+            neighbor_color = colors[neighbor]
+            if neighbor_color == EMPTY:
+                liberties += 1
+            elif neighbor_color == color:
+                root = string_id[neighbor]
+                if root not in adjacent_same_color:
+                    adjacent_same_color.append(root)
+            elif neighbor_color != OFF_BOARD:
+                root = string_id[neighbor]
+                if root not in adjacent_opposite_color:
+                    adjacent_opposite_color.append(root)
+
+        # Everything overwritten below is recorded so undo() can restore
+        # the exact previous arrays, stale cells included.
+        merges = []
+        liberty_changes = []
+        captures = []
+        undo_entry = (
+            index, self._hash,
+            (string_id[index], next_stone[index],
+             num_stones[index], num_liberties[index]),
+            merges, liberty_changes, captures)
+
+        colors[index] = color
+        string_id[index] = index
+        next_stone[index] = index
+        num_stones[index] = 1
+        num_liberties[index] = liberties
+        self._hash ^= self._geometry.hash_codes[color][index]
+        self._stone_counts[color] += 1
+
+        root = index
+        for other in adjacent_same_color:
+            # Union by size: relabel the smaller string, then splice the
+            # two circular stone lists by swapping their successors.
+            if num_stones[other] >= num_stones[root]:
+                big, small = other, root
+            else:
+                big, small = root, other
+            merges.append((big, small, num_stones[big]))
+            stone = small
+            while True:
+                string_id[stone] = big
+                stone = next_stone[stone]
+                if stone == small:
+                    break
+            next_stone[big], next_stone[small] = next_stone[small], next_stone[big]
+            num_stones[big] += num_stones[small]
+            root = big
+        if adjacent_same_color:
+            liberty_changes.append((root, num_liberties[root]))
+            num_liberties[root] = self._count_liberties(root)
+
+        for other in adjacent_opposite_color:
+            liberty_changes.append((other, num_liberties[other]))
+            num_liberties[other] -= 1
+            if num_liberties[other] == 0:
+                captures.append(other)
+                self._remove_string(other, liberty_changes)
+        return undo_entry
+
+    def undo(self, undo_entry):
+        """Revert the place_stone call that returned undo_entry.
+
+        Entries must be undone in the reverse order they were made.
+        """
+        index, old_hash, saved_cells, merges, liberty_changes, captures = undo_entry
+        colors = self._colors
+        string_id = self._string_id
+        next_stone = self._next_stone
+        num_stones = self._num_stones
+        num_liberties = self._num_liberties
+
+        # Captured stones keep their string ids and stone lists, so
+        # putting them back only needs the color.
+        color = colors[index]
+        captured_color = BLACK + WHITE - color
+        for root in captures:
+            stone = root
+            while True:
+                colors[stone] = captured_color
+                stone = next_stone[stone]
+                if stone == root:
+                    break
+            self._stone_counts[captured_color] += num_stones[root]
+            self._capture_counts[color] -= num_stones[root]
+        for root, old_liberties in reversed(liberty_changes):
+            num_liberties[root] = old_liberties
+        for big, small, old_num_stones in reversed(merges):
+            # Swapping the same successors again splits the circular list.
+            next_stone[big], next_stone[small] = next_stone[small], next_stone[big]
+            stone = small
+            while True:
+                string_id[stone] = small
+                stone = next_stone[stone]
+                if stone == small:
+                    break
+            num_stones[big] = old_num_stones
+
+        colors[index] = EMPTY
+        self._stone_counts[color] -= 1
+        string_id[index], next_stone[index], num_stones[index], num_liberties[index] = saved_cells
+        self._hash = old_hash
+
+    def _count_liberties(self, root):
+        colors = self._colors
+        next_stone = self._next_stone
+        stride = self._geometry.stride
+        liberties = set()
+        stone = root
+        while True:
+            for neighbor in (stone - stride, stone + stride, stone - 1, stone + 1):
+                if colors[neighbor] == EMPTY:
+                    liberties.add(neighbor)
+            stone = next_stone[stone]
+            if stone == root:
+                break
+        return len(liberties)
+
+    def _remove_string(self, root, liberty_changes):
+        colors = self._colors
+        string_id = self._string_id
+        next_stone = self._next_stone
+        num_liberties = self._num_liberties
+        stride = self._geometry.stride
+        color = colors[root]
+        capturer = BLACK + WHITE - color
+        hash_codes = self._geometry.hash_codes[color]
+
+        stone = root
+        while True:
+            colors[stone] = EMPTY
+            self._hash ^= hash_codes[stone]
+            # The emptied point is a new liberty for each distinct string
+            # of the capturing color around it.
+            touched = []
+            for neighbor in (stone - stride, stone + stride, stone - 1, stone + 1):
+                if colors[neighbor] == capturer:
+                    neighbor_root = string_id[neighbor]
+                    if neighbor_root not in touched:
+                        touched.append(neighbor_root)
+                        liberty_changes.append((neighbor_root, num_liberties[neighbor_root]))
+                        num_liberties[neighbor_root] += 1
+            stone = next_stone[stone]
+            if stone == root:
+                break
+        self._stone_counts[color] -= self._num_stones[root]
+        self._capture_counts[capturer] += self._num_stones[root]
+
+    def _is_self_capture(self, color, index):
+        colors = self._colors
+        string_id = self._string_id
+        num_liberties = self._num_liberties
+        stride = self._geometry.stride
+        for neighbor in (index - stride, index + stride, index - 1, index + 1):
+            neighbor_color = colors[neighbor]
+            if neighbor_color == EMPTY:
+                return False
+            if neighbor_color == OFF_BOARD:
+                continue
+            if neighbor_color == color:
+                if num_liberties[string_id[neighbor]] > 1:
+                    return False
+            elif num_liberties[string_id[neighbor]] == 1:
+                return False
+        return True
+
+    def _will_capture(self, color, index):
+        colors = self._colors
+        string_id = self._string_id
+        num_liberties = self._num_liberties
+        stride = self._geometry.stride
+        for neighbor in (index - stride, index + stride, index - 1, index + 1):
+            neighbor_color = colors[neighbor]
+            if neighbor_color != EMPTY and neighbor_color != OFF_BOARD and \
+                    neighbor_color != color and \
+                    num_liberties[string_id[neighbor]] == 1:
+                return True
+        return False
+
+    def is_self_capture(self, player, point):
+        return self._is_self_capture(player.value, self._geometry.index[point])
+
+    def will_capture(self, player, point):
+        return self._will_capture(player.value, self._geometry.index[point])
+
+    def legal_move_mask(self, player, previous_states, exclude_eyes=False):
+        """Boolean (num_rows, num_cols) array of the points player may play.
+
+        Computed for the whole board at once from the color and liberty
+        arrays; only points that capture are played out for the ko check
+        against previous_states.
+        """
+        color = player.value
+        colors = self.color_grid()
+        liberties = self.liberty_grid()
+
+        empty = colors[1:-1, 1:-1] == EMPTY
+        gives_liberty = (colors == EMPTY) | ((colors == color) & (liberties > 1))
+        captures = self._capture_mask(colors, liberties, color)
+        mask = empty & (_any_neighbor(gives_liberty) | captures)
+        mask &= ~self._repeat_mask(player, captures, previous_states)
+
+        if exclude_eyes:
+            friendly = colors == color
+            off_board = colors == OFF_BOARD
+            edge_or_friendly = friendly | off_board
+            surrounded = edge_or_friendly[:-2, 1:-1] & edge_or_friendly[2:, 1:-1] & \
+                edge_or_friendly[1:-1, :-2] & edge_or_friendly[1:-1, 2:]
+            friendly_corners = friendly[:-2, :-2].astype(np.int8) + friendly[:-2, 2:] + \
+                friendly[2:, :-2] + friendly[2:, 2:]
+            off_board_corners = off_board[:-2, :-2].astype(np.int8) + off_board[:-2, 2:] + \
+                off_board[2:, :-2] + off_board[2:, 2:]
+            eyes = surrounded & np.where(
+                off_board_corners > 0,
+                off_board_corners + friendly_corners == 4,
+                friendly_corners >= 3)
+            mask &= ~eyes
+        return mask
+
+    def ko_mask(self, player, previous_states):
+        """Boolean (num_rows, num_cols) array of the empty points where
+        player's move would repeat a situation in previous_states.
+
+        Only a move that captures can repeat a position, so only those
+        points are played out and undone.
+        """
+        return self._repeat_mask(player, self.capture_mask(player), previous_states)
+
+    def capture_mask(self, player):
+        """Boolean (num_rows, num_cols) array of the empty points where
+        player's move would capture."""
+        return self._capture_mask(self.color_grid(), self.liberty_grid(), player.value)
+
+    @staticmethod
+    def _capture_mask(colors, liberties, color):
+        in_atari = (colors == BLACK + WHITE - color) & (liberties == 1)
+        return (colors[1:-1, 1:-1] == EMPTY) & _any_neighbor(in_atari)
+
+    def _repeat_mask(self, player, captures, previous_states):
+        repeats = np.zeros(captures.shape, dtype=bool)
+        cols = self.num_cols + 2
+        for r, c in zip(*np.nonzero(captures)):
+            index = (r + 1) * cols + c + 1
+            undo_entry = self._place(player.value, index)
+            next_situation = (player.other, self._hash)
+            self.undo(undo_entry)
+            if next_situation in previous_states:
+                repeats[r, c] = True
+        return repeats
+
+    def color_grid(self):
+        """Read-only (num_rows + 2, num_cols + 2) int8 view of the colors.
+
+        Cells hold EMPTY, BLACK or WHITE, and the one cell border around
+        the board holds OFF_BOARD. The view changes as the board does.
+        """
+        colors = np.frombuffer(self._colors, dtype=np.int8).reshape(
+            self.num_rows + 2, self.num_cols + 2)
+        colors.flags.writeable = False
+        return colors
+
+    def liberty_grid(self):
+        """(num_rows + 2, num_cols + 2) array of the liberty count of the
+        string on each point, 0 on empty points and the border."""
+        shape = (self.num_rows + 2, self.num_cols + 2)
+        colors = np.frombuffer(self._colors, dtype=np.int8).reshape(shape)
+        liberties = np.frombuffer(self._num_liberties, dtype=np.intc)[
+            np.frombuffer(self._string_id, dtype=np.intc)].reshape(shape)
+        # Empty cells keep stale string ids from earlier stones.
+        liberties[(colors == EMPTY) | (colors == OFF_BOARD)] = 0
+        return liberties
+
+    def stone_count(self, player):
+        """Number of player's stones on the board."""
+        return self._stone_counts[player.value]
+
+    def capture_count(self, player):
+        """Number of opposing stones player has captured."""
+        return self._capture_counts[player.value]
+
+    def is_on_grid(self, point):
+        return 1 <= point.row <= self.num_rows and \
+               1 <= point.col <= self.num_cols
+
+    def get(self, point):
+        index = self._geometry.index.get(point)
+        if index is None:
+            return None
+        return COLOR_TO_PLAYER[self._colors[index]]
+
+    def get_go_string(self, point):
+        index = self._geometry.index.get(point)
+        if index is None or self._colors[index] == EMPTY:
+            return None
+        colors = self._colors
+        next_stone = self._next_stone
+        points = self._geometry.points
+        stride = self._geometry.stride
+        root = self._string_id[index]
+        stones = []
+        liberties = set()
+        stone = root
+        while True:
+            stones.append(points[stone])
+            for neighbor in (stone - stride, stone + stride, stone - 1, stone + 1):
+                if colors[neighbor] == EMPTY:
+                    liberties.add(points[neighbor])
+            stone = next_stone[stone]
+            if stone == root:
+                break
+        return GoString(COLOR_TO_PLAYER[colors[root]], stones, liberties)
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and \
+               self.num_rows == other.num_rows and \
+               self.num_cols == other.num_cols and \
+               self._hash == other._hash
+
+    def __deepcopy__(self, memodict={}):
+        copied = Board.__new__(Board)
+        copied.num_rows = self.num_rows
+        copied.num_cols = self.num_cols
+        copied._geometry = self._geometry
+        copied._colors = self._colors[:]
+        copied._string_id = self._string_id[:]
+        copied._next_stone = self._next_stone[:]
+        copied._num_stones = self._num_stones[:]
+        copied._num_liberties = self._num_liberties[:]
+        copied._hash = self._hash
+        copied._stone_counts = self._stone_counts[:]
+        copied._capture_counts = self._capture_counts[:]
+        copied.neighbor_table = self.neighbor_table
+        copied.corner_table = self.corner_table
+        return copied
+
+    def zobrist_hash(self):
+        return self._hash
+
+
+def copy_board(board):
+    """Return an array Board with the same stones as any board backend."""
+    if isinstance(board, Board):
+        return copy.deepcopy(board)
+    # Any legal position can be rebuilt stone by stone: no partial string
+    # runs out of liberties before its final shape does.
+    copied = Board(board.num_rows, board.num_cols)
+    geometry = copied._geometry
+    for index in geometry.on_board:
+        color = board.get(geometry.points[index])
+        if color is not None:
+            copied._place(color.value, index)
+    return copied
+
+
+class GameState(goboard_fast.GameState):
+    @classmethod
+    def new_game(cls, board_size):
+        if isinstance(board_size, int):
+            board_size = (board_size, board_size)
+        board = Board(*board_size)
+        return GameState(board, Player.black, None, None)
+
+    def does_move_violate_ko(self, player, move):
+        if not move.is_play:
+            return False
+        if not self.board.will_capture(player, move.point):
+            return False
+        undo_entry = self.board.place_stone(player, move.point)
+        next_situation = (player.other, self.board.zobrist_hash())
+        self.board.undo(undo_entry)
+        return next_situation in self.previous_states
+
+    def legal_moves(self):
+        return legal_moves_from_mask(self)
+
+    def legal_move_mask(self, exclude_eyes=False):
+        if self.is_over():
+            return np.zeros((self.board.num_rows, self.board.num_cols), dtype=bool)
+        return self.board.legal_move_mask(self.next_player, self.previous_states, exclude_eyes)
+
+
+def legal_moves_from_mask(game_state):
+    if game_state.is_over():
+        return []
+    grid_points = game_state.board._geometry.points
+    on_board = game_state.board._geometry.on_board
+    moves = [Move.play(grid_points[on_board[i]])
+             for i in np.flatnonzero(game_state.legal_move_mask()).tolist()]
+    moves.append(Move.pass_turn())
+    moves.append(Move.resign())
+    return moves
+
+
+class SearchState:
+    """Mutable game position for tree search.
+
+    make_move plays a move on a single board and unmake_move reverts the
+    most recent one, so a search can walk the game tree without
+    allocating a board per node. It answers the same queries as
+    GameState, so evaluation functions accept either.
+    """
+
+    def __init__(self, board, next_player, previous_states=(), moves=(None, None)):
+        self.board = board
+        self.next_player = next_player
+        self.previous_states = {}
+        for situation in previous_states:
+            self.previous_states[situation] = 1
+        self._moves = list(moves)
+        self._history = []
+
+    @classmethod
+    def from_game_state(cls, game_state):
+        board = copy_board(game_state.board)
+        second_last_move = None
+        if game_state.previous_state is not None:
+            second_last_move = game_state.previous_state.last_move
+        return SearchState(board, game_state.next_player,
+                           game_state.previous_states,
+                           (second_last_move, game_state.last_move))
+
+    @property
+    def last_move(self):
+        return self._moves[-1]
+
+    @property
+    def depth(self):
+        """Number of moves made since construction and not yet unmade."""
+        return len(self._history)
+
+    def make_move(self, move):
+        situation = (self.next_player, self.board.zobrist_hash())
+        self.previous_states[situation] = self.previous_states.get(situation, 0) + 1
+        undo_entry = None
+        if move.is_play:
+            undo_entry = self.board.place_stone(self.next_player, move.point)
+        self._history.append((situation, undo_entry))
+        self._moves.append(move)
+        self.next_player = self.next_player.other
+
+    def unmake_move(self):
+        situation, undo_entry = self._history.pop()
+        self._moves.pop()
+        if undo_entry is not None:
+            self.board.undo(undo_entry)
+        count = self.previous_states[situation] - 1
+        if count:
+            self.previous_states[situation] = count
+        else:
+            del self.previous_states[situation]
+        self.next_player = self.next_player.other
+
+    def is_move_self_capture(self, player, move):
+        if not move.is_play:
+            return False
+        return self.board.is_self_capture(player, move.point)
+
+    @property
+    def situation(self):
+        return self.next_player, self.board
+
+    def does_move_violate_ko(self, player, move):
+        if not move.is_play:
+            return False
+        if not self.board.will_capture(player, move.point):
+            return False
+        undo_entry = self.board.place_stone(player, move.point)
+        next_situation = (player.other, self.board.zobrist_hash())
+        self.board.undo(undo_entry)
+        return next_situation in self.previous_states
+
+    def is_valid_move(self, move):
+        if self.is_over():
+            return False
+        if move.is_pass or move.is_resign:
+            return True
+        return (
+                self.board.get(move.point) is None and
+                not self.is_move_self_capture(self.next_player, move) and
+                not self.does_move_violate_ko(self.next_player, move))
+
+    def is_over(self):
+        last_move = self._moves[-1]
+        if last_move is None:
+            return False
+        if last_move.is_resign:
+            return True
+        second_last_move = self._moves[-2]
+        if second_last_move is None:
+            return False
+        return last_move.is_pass and second_last_move.is_pass
+
+    def legal_moves(self):
+        return legal_moves_from_mask(self)
+
+    def legal_move_mask(self, exclude_eyes=False):
+        if self.is_over():
+            return np.zeros((self.board.num_rows, self.board.num_cols), dtype=bool)
+        return self.board.legal_move_mask(self.next_player, self.previous_states, exclude_eyes)
+
+    def winner(self):
+        if not self.is_over():
+            return None
+        if self.last_move.is_resign:
+            return self.next_player
+        game_result = compute_game_result(self)
+        return game_result.winner
@@ -0,0 +1,220 @@
+import random
+import unittest
+
+import six
+
+from dlgo import goboard_fast
+from dlgo.goboard_array import Board, GameState, Move, SearchState
+from dlgo.gotypes import Player, Point
+
+
+class BoardTest(unittest.TestCase):
+    def test_capture(self):
+        board = Board(19, 19)
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.white, Point(1, 2))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        board.place_stone(Player.white, Point(2, 1))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        board.place_stone(Player.white, Point(2, 3))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        board.place_stone(Player.white, Point(3, 2))
+        self.assertIsNone(board.get(Point(2, 2)))
+
+    def test_capture_two_stones(self):
+        board = Board(19, 19)
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.black, Point(2, 3))
+        board.place_stone(Player.white, Point(1, 2))
+        board.place_stone(Player.white, Point(1, 3))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        self.assertEqual(Player.black, board.get(Point(2, 3)))
+        board.place_stone(Player.white, Point(3, 2))
+        board.place_stone(Player.white, Point(3, 3))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        self.assertEqual(Player.black, board.get(Point(2, 3)))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(2, 4))
+        self.assertIsNone(board.get(Point(2, 2)))
+        self.assertIsNone(board.get(Point(2, 3)))
+
+    def test_capture_is_not_suicide(self):
+        board = Board(19, 19)
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.black, Point(1, 3))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(1, 2))
+        self.assertIsNone(board.get(Point(1, 1)))
+        self.assertEqual(Player.white, board.get(Point(2, 1)))
+        self.assertEqual(Player.white, board.get(Point(1, 2)))
+
+    def test_remove_liberties(self):
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(3, 3))
+        board.place_stone(Player.white, Point(2, 2))
+        white_string = board.get_go_string(Point(2, 2))
+        six.assertCountEqual(
+            self,
+            [Point(2, 3), Point(2, 1), Point(1, 2), Point(3, 2)],
+            white_string.liberties)
+        board.place_stone(Player.black, Point(3, 2))
+        white_string = board.get_go_string(Point(2, 2))
+        six.assertCountEqual(
+            self,
+            [Point(2, 3), Point(2, 1), Point(1, 2)],
+            white_string.liberties)
+
+    def test_empty_triangle(self):
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.black, Point(1, 2))
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.white, Point(2, 1))
+
+        black_string = board.get_go_string(Point(1, 1))
+        six.assertCountEqual(
+            self,
+            [Point(3, 2), Point(2, 3), Point(1, 3)],
+            black_string.liberties)
+
+    def test_self_capture(self):
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.black, Point(1, 3))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(2, 2))
+        board.place_stone(Player.white, Point(2, 3))
+        board.place_stone(Player.white, Point(1, 4))
+
+        self.assertTrue(board.is_self_capture(Player.black, Point(1, 2)))
+
+    def test_not_self_capture(self):
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.black, Point(1, 3))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(2, 3))
+        board.place_stone(Player.white, Point(1, 4))
+
+        self.assertFalse(board.is_self_capture(Player.black, Point(1, 2)))
+
+    def test_not_self_capture_is_other_capture(self):
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(3, 1))
+        board.place_stone(Player.black, Point(3, 2))
+        board.place_stone(Player.black, Point(2, 3))
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(2, 2))
+        board.place_stone(Player.white, Point(1, 3))
+
+        self.assertFalse(board.is_self_capture(Player.black, Point(1, 2)))
+
+
+class GameTest(unittest.TestCase):
+    def test_new_game(self):
+        start = GameState.new_game(19)
+        next_state = start.apply_move(Move.play(Point(16, 16)))
+
+        self.assertEqual(start, next_state.previous_state)
+        self.assertEqual(Player.white, next_state.next_player)
+        self.assertEqual(Player.black, next_state.board.get(Point(16, 16)))
+
+    def test_matches_goboard_fast(self):
+        random.seed(481)
+        game = GameState.new_game(9)
+        reference = goboard_fast.GameState.new_game(9)
+        points = [Point(r, c) for r in range(1, 10) for c in range(1, 10)]
+        for _ in range(150):
+            candidates = [p for p in points if game.is_valid_move(Move.play(p))]
+            self.assertEqual(
+                candidates,
+                [p for p in points if reference.is_valid_move(Move.play(p))])
+            for exclude_eyes in (False, True):
+                self.assertEqual(
+                    reference.legal_move_mask(exclude_eyes).tolist(),
+                    game.legal_move_mask(exclude_eyes).tolist())
+            move = Move.play(random.choice(candidates)) if candidates else Move.pass_turn()
+            game = game.apply_move(move)
+            reference = reference.apply_move(move)
+            self.assertEqual(reference.board.zobrist_hash(), game.board.zobrist_hash())
+            for p in points:
+                expected = reference.board.get_go_string(p)
+                actual = game.board.get_go_string(p)
+                if expected is None:
+                    self.assertIsNone(actual)
+                else:
+                    self.assertEqual(expected, actual)
+
+
+class UndoTest(unittest.TestCase):
+    def snapshot(self, board):
+        return (board.zobrist_hash(), board._colors.tolist(), board._string_id.tolist(),
+                board._next_stone.tolist(), board._num_stones.tolist(),
+                board._num_liberties.tolist(), board._stone_counts[:], board._capture_counts[:])
+
+    def test_undo_restores_every_array(self):
+        random.seed(2)
+        game = GameState.new_game(9)
+        board = Board(9, 9)
+        snapshots = []
+        undo_entries = []
+        for _ in range(200):
+            candidates = game.legal_moves()
+            move = random.choice(candidates[:-1])
+            if move.is_play:
+                snapshots.append(self.snapshot(board))
+                undo_entries.append(board.place_stone(game.next_player, move.point))
+            game = game.apply_move(move)
+            if game.is_over():
+                break
+        self.assertEqual(game.board.zobrist_hash(), board.zobrist_hash())
+        while undo_entries:
+            board.undo(undo_entries.pop())
+            self.assertEqual(snapshots.pop(), self.snapshot(board))
+
+    def test_running_counts_match_board(self):
+        random.seed(4)
+        board = Board(9, 9)
+        player = Player.black
+        captured = {Player.black: 0, Player.white: 0}
+        for _ in range(300):
+            empty = [p for p in board._geometry.points if p is not None and board.get(p) is None
+                     and not board.is_self_capture(player, p)]
+            if not empty:
+                break
+            before = board.stone_count(player.other)
+            board.place_stone(player, random.choice(empty))
+            captured[player] += before - board.stone_count(player.other)
+            player = player.other
+        self.assertGreater(captured[Player.black] + captured[Player.white], 0)
+        for color in (Player.black, Player.white):
+            on_board = sum(1 for p in board._geometry.points
+                           if p is not None and board.get(p) == color)
+            self.assertEqual(on_board, board.stone_count(color))
+            self.assertEqual(captured[color], board.capture_count(color))
+
+    def test_search_state_matches_game_state(self):
+        random.seed(3)
+        game = GameState.new_game(5)
+        search_state = SearchState.from_game_state(game)
+        states = [game]
+        for _ in range(60):
+            self.assertEqual(game.legal_moves(), search_state.legal_moves())
+            if game.is_over():
+                break
+            move = random.choice(game.legal_moves()[:-1])
+            game = game.apply_move(move)
+            search_state.make_move(move)
+            states.append(game)
+        while search_state.depth:
+            search_state.unmake_move()
+            states.pop()
+            self.assertEqual(states[-1].board.zobrist_hash(),
+                             search_state.board.zobrist_hash())
+            self.assertEqual(states[-1].legal_moves(), search_state.legal_moves())
+
+
+if __name__ == '__main__':
+    unittest.main()
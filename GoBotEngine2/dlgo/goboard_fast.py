@@ -1,4 +1,7 @@
 import copy
+
+import numpy as np
+
 from dlgo.gotypes import Player, Point
 from dlgo.scoring import compute_game_result
 from dlgo import zobrist
@@ -8,6 +11,9 @@ __all__ = [
     'Board',
     'GameState',
     'Move',
+    'PreviousStates',
+    'detach_game_state',
+    'is_point_an_eye',
 ]
 
 neighbor_tables = {}
@@ -279,17 +285,107 @@ class Move:
                    other.point)
 
 
+class _HistoryChain:
+    __slots__ = ('parent', 'parent_length', 'first_seen', 'length')
+
+    def __init__(self, parent, parent_length):
+        self.parent = parent
+        self.parent_length = parent_length
+        # Situation -> position in the game where it first appeared.
+        self.first_seen = {}
+        self.length = parent_length
+
+
+class PreviousStates:
+    """The situations of all earlier states of a game, as a set.
+
+    States along one line of play share a single chain and each only looks
+    at the first len(self) entries, so adding a situation is O(1) instead
+    of copying the whole set. A state that is extended twice (a branch in
+    a search tree) starts a new chain that points back to the shared one.
+    """
+    __slots__ = ('_chain', '_length')
+
+    def __init__(self, chain=None, length=0):
+        self._chain = chain
+        self._length = length
+
+    def with_situation(self, situation):
+        chain = self._chain
+        if chain is None or chain.length != self._length:
+            chain = _HistoryChain(chain, self._length)
+        chain.first_seen.setdefault(situation, self._length)
+        chain.length += 1
+        return PreviousStates(chain, self._length + 1)
+
+    def __contains__(self, situation):
+        chain = self._chain
+        length = self._length
+        while chain is not None:
+            position = chain.first_seen.get(situation)
+            if position is not None and position < length:
+                return True
+            length = chain.parent_length
+            chain = chain.parent
+        return False
+
+    def __iter__(self):
+        seen = set()
+        chain = self._chain
+        length = self._length
+        while chain is not None:
+            for situation, position in chain.first_seen.items():
+                if position < length and situation not in seen:
+                    seen.add(situation)
+                    yield situation
+            length = chain.parent_length
+            chain = chain.parent
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def is_point_an_eye(board, point, color):
+    if board.get(point) is not None:
+        return False
+
+    for neighbor in board.neighbors(point):
+        neighbor_color = board.get(neighbor)
+        if neighbor_color != color:
+            return False
+
+    friendly_corners = 0
+    off_board_corners = 0
+    corners = [
+        Point(point.row - 1, point.col - 1),
+        Point(point.row - 1, point.col + 1),
+        Point(point.row + 1, point.col - 1),
+        Point(point.row + 1, point.col + 1),
+    ]
+    for corner in corners:
+        if board.is_on_grid(corner):
+            corner_color = board.get(corner)
+            if corner_color == color:
+                friendly_corners += 1
+        else:
+            off_board_corners += 1
+    if off_board_corners > 0:
+
+        return off_board_corners + friendly_corners == 4
+
+    return friendly_corners >= 3
+
+
 class GameState:
     def __init__(self, board, next_player, previous, move):
         self.board = board
         self.next_player = next_player
         self.previous_state = previous
         if previous is None:
-            self.previous_states = frozenset()
+            self.previous_states = PreviousStates()
         else:
-            self.previous_states = frozenset(
-                previous.previous_states |
-                {(previous.next_player, previous.board.zobrist_hash())})
+            self.previous_states = previous.previous_states.with_situation(
+                (previous.next_player, previous.board.zobrist_hash()))
         self.last_move = move
 
     def apply_move(self, move):
@@ -299,7 +395,7 @@ class GameState:
             next_board.place_stone(self.next_player, move.point)
         else:
             next_board = self.board
-        return GameState(next_board, self.next_player.other, self, move)
+        return self.__class__(next_board, self.next_player.other, self, move)
 
     @classmethod
     def new_game(cls, board_size):
@@ -362,6 +458,25 @@ class GameState:
 
         return moves
 
+    def legal_move_mask(self, exclude_eyes=False):
+        """Boolean (num_rows, num_cols) array of the points next_player may play.
+
+        With exclude_eyes, points that are eyes of next_player are left out
+        as well. Row r, column c of the board is entry [r - 1, c - 1].
+        """
+        mask = np.zeros((self.board.num_rows, self.board.num_cols), dtype=bool)
+        if self.is_over():
+            return mask
+        for row in range(1, self.board.num_rows + 1):
+            for col in range(1, self.board.num_cols + 1):
+                point = Point(row, col)
+                if not self.is_valid_move(Move.play(point)):
+                    continue
+                if exclude_eyes and is_point_an_eye(self.board, point, self.next_player):
+                    continue
+                mask[row - 1, col - 1] = True
+        return mask
+
     def winner(self):
         if not self.is_over():
             return None
@@ -369,3 +484,17 @@ class GameState:
             return self.next_player
         game_result = compute_game_result(self)
         return game_result.winner
+
+
+def detach_game_state(game_state):
+    """Shallow copy of game_state that pickles without its whole history.
+
+    Only the previous state's last move is needed to tell whether the game
+    is over; the superko history travels in previous_states.
+    """
+    detached = copy.copy(game_state)
+    if game_state.previous_state is not None:
+        previous = copy.copy(game_state.previous_state)
+        previous.previous_state = None
+        detached.previous_state = previous
+    return detached
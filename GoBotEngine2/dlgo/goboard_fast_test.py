@@ -1,8 +1,10 @@
+import pickle
+import random
 import unittest
 
 import six
 
-from dlgo.goboard_fast import Board, GameState, Move
+from dlgo.goboard_fast import Board, GameState, Move, PreviousStates, detach_game_state
 from dlgo.gotypes import Player, Point
 
 
@@ -120,5 +122,41 @@ class GameTest(unittest.TestCase):
         self.assertEqual(Player.black, next_state.board.get(Point(16, 16)))
 
 
+class PreviousStatesTest(unittest.TestCase):
+    def test_branches_do_not_see_each_other(self):
+        root = PreviousStates().with_situation('a')
+        left = root.with_situation('b').with_situation('c')
+        right = root.with_situation('d')
+        self.assertIn('a', right)
+        self.assertNotIn('b', right)
+        self.assertNotIn('c', right)
+        self.assertNotIn('d', left)
+        self.assertNotIn('b', root)
+        six.assertCountEqual(self, ['a', 'b', 'c'], left)
+        six.assertCountEqual(self, ['a', 'd'], right)
+
+    def test_matches_situations_of_earlier_states(self):
+        game = GameState.new_game(5)
+        situations = set()
+        for point in [Point(1, 1), Point(3, 3), Point(1, 2), Point(2, 2)]:
+            situations.add((game.next_player, game.board.zobrist_hash()))
+            game = game.apply_move(Move.play(point))
+        six.assertCountEqual(self, situations, game.previous_states)
+        self.assertNotIn((game.next_player, game.board.zobrist_hash()),
+                         game.previous_states)
+
+
+class DetachTest(unittest.TestCase):
+    def test_detached_state_pickles_long_games(self):
+        random.seed(7)
+        game = GameState.new_game(9)
+        while not game.is_over():
+            game = game.apply_move(random.choice(game.legal_moves()[:-1]))
+        restored = pickle.loads(pickle.dumps(detach_game_state(game)))
+        self.assertEqual(game.board.zobrist_hash(), restored.board.zobrist_hash())
+        self.assertEqual(game.legal_moves(), restored.legal_moves())
+        self.assertEqual(game.is_over(), restored.is_over())
+
+
 if __name__ == '__main__':
     unittest.main()
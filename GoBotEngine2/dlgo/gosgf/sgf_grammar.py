@@ -2,6 +2,7 @@ from __future__ import absolute_import
 import re
 import string
 
+import numpy as np
 import six
 
 _propident_re = re.compile(r"\A[A-Z]{1,8}\Z".encode('ascii'))
@@ -129,6 +130,159 @@ def parse_sgf_game(s):
     return game_tree
 
 
+_main_line_re = re.compile(r"""
+\s*
+(?:
+    (?P<I> [A-Z]{1,8} ) \s*                                    # PropIdent
+    \[ (?P<V> [^\\\]]* (?: \\. [^\\\]]* )* ) \]                # its first PropValue
+    (?P<M> (?: \s* \[ [^\\\]]* (?: \\. [^\\\]]* )* \] )* )     # and the others
+    |
+    (?P<D> [;()] )                                            # delimiter
+    |
+    (?P<X> \S )                                               # anything else
+)
+""".encode('ascii'), re.VERBOSE | re.DOTALL)
+_values_re = re.compile(r"\[ ( [^\\\]]* (?: \\. [^\\\]]* )* ) \]".encode('ascii'),
+                        re.VERBOSE | re.DOTALL)
+_root_properties = frozenset([b"SZ", b"HA", b"AB", b"AW"])
+
+
+class Main_line:
+
+    def __init__(self, size, handicap, setup_black, setup_white, moves):
+        self.size = size
+        self.handicap = handicap
+        self.setup_black = setup_black
+        self.setup_white = setup_white
+        self.moves = moves
+
+
+def _main_line_point(value, size):
+    if value == b"" or (value == b"tt" and size <= 19):
+        return -1, -1
+    if len(value) != 2:
+        raise ValueError("bad point: %r" % value)
+    col = six.indexbytes(value, 0) - 97
+    row = size - six.indexbytes(value, 1) + 96
+    if not ((0 <= col < size) and (0 <= row < size)):
+        raise ValueError("point out of range: %r" % value)
+    return row, col
+
+
+def _main_line_moves(colours, values, size):
+    # Passes are given as b"" or b"tt"; both become two zero bytes so
+    # every move takes two bytes.
+    points = np.frombuffer(b"".join(values), dtype=np.uint8).reshape(len(values), 2)
+    is_pass = points[:, 0] == 0
+    if size <= 19:
+        is_pass |= (points[:, 0] == 116) & (points[:, 1] == 116)
+    moves = np.empty((len(colours), 3), dtype=np.int16)
+    moves[:, 0] = colours
+    moves[:, 1] = size - points[:, 1].astype(np.int16) + 96
+    moves[:, 2] = points[:, 0].astype(np.int16) - 97
+    played = moves[~is_pass, 1:]
+    if ((played < 0) | (played >= size)).any():
+        raise ValueError("move out of range")
+    moves[is_pass, 1:] = -1
+    return moves
+
+
+def _main_line_points(values, size):
+    points = []
+    for value in values:
+        p1, is_rectangle, p2 = value.partition(b":")
+        top, left = _main_line_point(p1, size)
+        bottom, right = _main_line_point(p2, size) if is_rectangle else (top, left)
+        if top < 0 or bottom < 0 or not (bottom <= top and left <= right):
+            raise ValueError("bad point list: %r" % value)
+        for row in range(bottom, top + 1):
+            for col in range(left, right + 1):
+                if (row, col) not in points:
+                    points.append((row, col))
+    return points
+
+
+def parse_main_line(s):
+    """Read only what is needed to replay the main line of the first game in s.
+
+    A fast path for bulk processing: the SGF data is scanned once, up to
+    the end of the main line, without building a game tree. Of the root
+    node only SZ, HA, AB and AW are kept; of every node on the main line,
+    its B or W move, like Tree_node.get_move.
+
+    Returns a Main_line. moves is an (N, 3) int16 array of (colour, row,
+    col) with colour 1 for black and 2 for white, and row and col -1 for
+    a pass; points count rows from the bottom as in sgf_properties.
+    handicap follows Sgf_game.get_handicap.
+    """
+    m = _find_start_re.search(s)
+    if not m:
+        raise ValueError("no SGF data found")
+    root = {}
+    colours = []
+    values = []
+    num_nodes = 0
+    node_move = None
+    finished = False
+    for prop_ident, value, more_values, delimiter, other in _main_line_re.findall(s, m.start()):
+        if prop_ident:
+            if num_nodes == 0:
+                raise ValueError("property value outside a node")
+            if num_nodes == 1 and prop_ident in _root_properties:
+                root.setdefault(prop_ident, []).append(value)
+                if more_values:
+                    root[prop_ident].extend(_values_re.findall(more_values))
+            # A node's first B value wins over its W, as in
+            # Tree_node.get_raw_move.
+            if (prop_ident == b"B" and (node_move is None or node_move[0] == 2)) or \
+                    (prop_ident == b"W" and node_move is None):
+                node_move = (1 if prop_ident == b"B" else 2, value)
+            continue
+        if other:
+            raise ValueError("unexpected character: %r" % other)
+        if node_move is not None:
+            colour, value = node_move
+            if value == b"":
+                value = b"\0\0"
+            elif len(value) != 2:
+                raise ValueError("bad move value: %r" % value)
+            colours.append(colour)
+            values.append(value)
+            node_move = None
+        if delimiter == b";":
+            num_nodes += 1
+        elif delimiter == b")":
+            # The main line always takes the first variation, so the
+            # first tree to close ends it.
+            finished = True
+            break
+    if not finished:
+        raise ValueError("unexpected end of SGF data")
+    if num_nodes == 0:
+        raise ValueError("empty sequence")
+
+    size = 19
+    if b"SZ" in root:
+        try:
+            size = int(root[b"SZ"][0])
+        except ValueError:
+            raise ValueError("bad SZ property: %s" % root[b"SZ"][0])
+        if not 1 <= size <= 26:
+            raise ValueError("size out of range: %s" % size)
+    handicap = None
+    if b"HA" in root:
+        handicap = int(root[b"HA"][0])
+        if handicap == 0:
+            handicap = None
+        elif handicap == 1:
+            raise ValueError("bad HA property: 1")
+
+    return Main_line(size, handicap,
+                     _main_line_points(root.get(b"AB", []), size),
+                     _main_line_points(root.get(b"AW", []), size),
+                     _main_line_moves(colours, values, size))
+
+
 def parse_sgf_collection(s):
     position = 0
     result = []
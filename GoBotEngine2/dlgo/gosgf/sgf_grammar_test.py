@@ -0,0 +1,50 @@
+import unittest
+
+from dlgo.gosgf import Sgf_game
+from dlgo.gosgf.sgf_grammar import parse_main_line
+
+
+def full_parse(sgf_content):
+    game = Sgf_game.from_string(sgf_content)
+    moves = []
+    for node in game.main_sequence_iter():
+        colour, point = node.get_move()
+        if colour is not None:
+            moves.append((1 if colour == 'b' else 2,) + (point or (-1, -1)))
+    black, white, _ = game.get_root().get_setup_stones()
+    return game.get_size(), game.get_handicap(), sorted(black), sorted(white), moves
+
+
+def main_line_parse(sgf_content):
+    main_line = parse_main_line(sgf_content)
+    return (main_line.size, main_line.handicap, sorted(main_line.setup_black),
+            sorted(main_line.setup_white), [tuple(move) for move in main_line.moves.tolist()])
+
+
+class ParseMainLineTest(unittest.TestCase):
+    def test_matches_full_parse(self):
+        games = [
+            b'(;GM[1]FF[4]SZ[19];B[aa];W[];B[bb])',
+            b'(;SZ[9]HA[2]AB[cc][gg]AW[ee:ff] C[a ;B[aa\\] (;W[bb]) comment];B[tt]W[ab]'
+            b';W[cd]B[de];B[ab]B[ac];W[dd]BL[30.5](;B[ee];W[ff](;B[aa])(;B[bb]))(;B[gg]))',
+            b'  junk (;SZ[13] ; B [ab] ;W[]  )(;B[cc])',
+            b'(;SZ[19](;B[aa];W[bb])(;B[cc]))',
+            b'(;SZ[25];B[tt];W[ya])',
+        ]
+        for game in games:
+            self.assertEqual(full_parse(game), main_line_parse(game))
+
+    def test_compact_moves(self):
+        moves = parse_main_line(b'(;SZ[19];B[pd];W[tt])').moves
+        self.assertEqual('int16', moves.dtype.name)
+        self.assertEqual([[1, 15, 15], [2, -1, -1]], moves.tolist())
+
+    def test_bad_data(self):
+        for game in (b'(;B[aa]', b'(;B[zz])', b'(;SZ[9]B[aa]?)', b'(B[aa])', b'nothing',
+                     b'(;HA[1];B[aa])'):
+            with self.assertRaises(ValueError):
+                parse_main_line(game)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,3 @@
-from .mcts import *
\ No newline at end of file
+from .budget import *
+from .mcts import *
+from .playout import *
@@ -0,0 +1,114 @@
+import time
+
+from dlgo.gotypes import Point
+
+__all__ = [
+    'SearchBudget',
+    'SearchLimit',
+]
+
+
+class SearchLimit:
+    """When to stop searching the current move.
+
+    The search stops after max_rounds rollouts, at the wall-clock deadline,
+    or, with early_stop, once the most visited root child leads the
+    runner-up by more rollouts than can still be played before either
+    limit is hit; MCTSAgent then plays the most visited child. At least
+    one round is always played.
+    """
+
+    def __init__(self, max_rounds=None, deadline=None, early_stop=False, check_every=16):
+        self.max_rounds = max_rounds
+        self.deadline = deadline
+        self.early_stop = early_stop
+        self.check_every = check_every
+        self.start_time = time.time()
+
+    def split(self, num_parts):
+        """Limits for num_parts searches that share this one's budget."""
+        limits = []
+        for i in range(num_parts):
+            max_rounds = None
+            if self.max_rounds is not None:
+                max_rounds = self.max_rounds // num_parts
+                if i < self.max_rounds % num_parts:
+                    max_rounds += 1
+            limit = SearchLimit(max_rounds, self.deadline, self.early_stop, self.check_every)
+            limit.start_time = self.start_time
+            limits.append(limit)
+        return limits
+
+    def rounds_left(self, rounds_done, now):
+        rounds_left = None
+        if self.max_rounds is not None:
+            rounds_left = self.max_rounds - rounds_done
+        if self.deadline is not None and rounds_done > 0:
+            rate = rounds_done / max(now - self.start_time, 1e-6)
+            by_time = rate * max(self.deadline - now, 0.0)
+            rounds_left = by_time if rounds_left is None else min(rounds_left, by_time)
+        return rounds_left
+
+    def should_stop(self, rounds_done, root):
+        if rounds_done == 0:
+            return False
+        if self.max_rounds is not None and rounds_done >= self.max_rounds:
+            return True
+        now = time.time()
+        if self.deadline is not None and now >= self.deadline:
+            return True
+        if self.early_stop and rounds_done % self.check_every == 0 and len(root.children) > 1:
+            rounds_left = self.rounds_left(rounds_done, now)
+            if rounds_left is not None:
+                visits = sorted((child.num_rollouts for child in root.children), reverse=True)
+                return visits[0] - visits[1] > rounds_left
+        return False
+
+
+class SearchBudget:
+    """Per-move and per-game search limits for MCTSAgent.
+
+    max_rounds caps the rollouts per move and move_time the seconds per
+    move. game_time is a clock for all of this agent's moves in a game:
+    each move gets the time left divided by the number of moves the agent
+    still expects to play, estimated as half the empty points but never
+    fewer than min_moves_left, and capped by move_time if that is set.
+    """
+
+    def __init__(self, max_rounds=None, move_time=None, game_time=None,
+                 min_moves_left=20, early_stop=True, check_every=16):
+        if max_rounds is None and move_time is None and game_time is None:
+            raise ValueError('A search budget needs max_rounds, move_time or game_time')
+        self.max_rounds = max_rounds
+        self.move_time = move_time
+        self.game_time = game_time
+        self.time_left = game_time
+        self.min_moves_left = min_moves_left
+        self.early_stop = early_stop
+        self.check_every = check_every
+
+    def new_game(self):
+        self.time_left = self.game_time
+
+    def allot_time(self, game_state):
+        seconds = self.move_time
+        if self.time_left is not None:
+            board = game_state.board
+            num_empty = 0
+            for row in range(1, board.num_rows + 1):
+                for col in range(1, board.num_cols + 1):
+                    if board.get(Point(row, col)) is None:
+                        num_empty += 1
+            moves_left = max(self.min_moves_left, num_empty // 2)
+            share = max(self.time_left, 0.0) / moves_left
+            seconds = share if seconds is None else min(seconds, share)
+        return seconds
+
+    def start_move(self, game_state):
+        seconds = self.allot_time(game_state)
+        deadline = None if seconds is None else time.time() + seconds
+        return SearchLimit(self.max_rounds, deadline, self.early_stop, self.check_every)
+
+    def finish_move(self, limit):
+        if self.time_left is not None:
+            self.time_left -= time.time() - limit.start_time
@@ -1,8 +1,12 @@
 import math
+import multiprocessing
 import random
 
 from dlgo import agent
+from dlgo.goboard_fast import detach_game_state
 from dlgo.gotypes import Player
+from dlgo.mcts.budget import SearchBudget
+from dlgo.mcts.playout import random_playout
 from dlgo.utils import coords_from_point
 
 __all__ = [
@@ -52,7 +56,15 @@ class MCTSNode(object):
         }
         self.num_rollouts = 0
         self.children = []
-        self.unvisited_moves = game_state.legal_moves()
+        self._unvisited_moves = None
+
+    @property
+    def unvisited_moves(self):
+        # Most new nodes only start a rollout and are never expanded, so
+        # their legal moves are generated on first use.
+        if self._unvisited_moves is None:
+            self._unvisited_moves = self.game_state.legal_moves()
+        return self._unvisited_moves
 
     def add_random_child(self):
         index = random.randint(0, len(self.unvisited_moves) - 1)
@@ -76,47 +88,232 @@ class MCTSNode(object):
         return float(self.win_counts[player]) / float(self.num_rollouts)
 
 
+def seed_worker():
+    # Forked workers inherit the parent's random state; reseed from the OS
+    # so they do not all play the same rollouts.
+    random.seed()
+
+
+def search_worker(args):
+    game_state, limit, temperature = args
+    bot = MCTSAgent(limit.max_rounds, temperature)
+    root = bot.search(game_state, limit)
+    return child_stats(root)
+
+
+def playout_worker(game_state):
+    return random_playout(game_state)
+
+
+def child_stats(root):
+    """Map each searched root move to [black wins, white wins, rollouts]."""
+    return {
+        child.move: [child.win_counts[Player.black],
+                     child.win_counts[Player.white],
+                     child.num_rollouts]
+        for child in root.children
+    }
+
+
 class MCTSAgent(agent.Agent):
-    def __init__(self, num_rounds, temperature):
+    """Monte Carlo tree search with random rollouts.
+
+    With num_workers > 1 the search runs in a process pool. In 'root' mode
+    every worker grows its own tree from the current position and the root
+    statistics are summed. In 'leaf' mode one tree is grown here and batches
+    of leaves are rolled out in the workers; queued leaves count as a visit
+    without a win until their result comes back, which steers the rest of
+    the batch elsewhere.
+
+    Pass a SearchBudget to bound each move by time or to stop early instead
+    of always playing num_rounds rollouts; num_rounds is then ignored. The
+    move played is the one with the best win fraction, or with early_stop
+    the most visited one, which is what the early stop keeps safe.
+
+    With reuse_tree the tree searched in one select_move is kept, and the
+    next call starts from the subtree reached by the moves played since,
+    looking back at most max_reuse_depth moves. Root-parallel trees live in
+    the workers and are not reused.
+    """
+
+    def __init__(self, num_rounds, temperature, num_workers=1, parallel_mode='root',
+                 batch_size=None, budget=None, reuse_tree=True, max_reuse_depth=4):
         agent.Agent.__init__(self)
+        if parallel_mode not in ('root', 'leaf'):
+            raise ValueError(parallel_mode + " is not a valid parallel mode, choose from 'root' or 'leaf'")
         self.num_rounds = num_rounds
         self.temperature = temperature
+        self.num_workers = num_workers
+        self.parallel_mode = parallel_mode
+        self.batch_size = batch_size or num_workers
+        if budget is None:
+            budget = SearchBudget(max_rounds=num_rounds, early_stop=False)
+        self.budget = budget
+        self.reuse_tree = reuse_tree
+        self.max_reuse_depth = max_reuse_depth
+        self._root = None
+        self._pool = None
 
-    def select_move(self, game_state):
-        root = MCTSNode(game_state)
-
-        for i in range(self.num_rounds):
-            node = root
-            while (not node.can_add_child()) and (not node.is_terminal()):
-                node = self.select_child(node)
-
-            if node.can_add_child():
-                node = node.add_random_child()
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(processes=self.num_workers,
+                                              initializer=seed_worker)
+        return self._pool
 
-            winner = self.simulate_random_game(node.game_state)
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
 
-            while node is not None:
-                node.record_win(winner)
-                node = node.parent
+    def select_move(self, game_state):
+        limit = self.budget.start_move(game_state)
+        if self.num_workers > 1 and self.parallel_mode == 'root':
+            move_stats = self.root_parallel_search(game_state, limit)
+        else:
+            root = self.reuse_root(game_state) if self.reuse_tree else None
+            if self.num_workers <= 1:
+                root = self.search(game_state, limit, root)
+            else:
+                root = self.leaf_parallel_search(game_state, limit, root)
+            if self.reuse_tree:
+                self._root = root
+            move_stats = child_stats(root)
+        self.budget.finish_move(limit)
 
+        player_wins = 0 if game_state.next_player == Player.black else 1
         scored_moves = [
-            (child.winning_frac(game_state.next_player), child.move, child.num_rollouts)
-            for child in root.children
+            (float(stats[player_wins]) / stats[2], move, stats[2])
+            for move, stats in move_stats.items()
         ]
         scored_moves.sort(key=lambda x: x[0], reverse=True)
         for s, m, n in scored_moves[:10]:
             print('%s - %.3f (%d)' % (m, s, n))
 
-        best_move = None
-        best_pct = -1.0
-        for child in root.children:
-            child_pct = child.winning_frac(game_state.next_player)
-            if child_pct > best_pct:
-                best_pct = child_pct
-                best_move = child.move
+        if self.budget.early_stop:
+            # An early stop only makes sure the most visited move cannot be
+            # overtaken, so that is the move to play.
+            best_pct, best_move, _ = max(scored_moves, key=lambda x: (x[2], x[0]))
+        else:
+            best_move = None
+            best_pct = -1.0
+            for child_pct, move, _ in scored_moves:
+                if child_pct > best_pct:
+                    best_pct = child_pct
+                    best_move = move
         print('Select move %s with win pct %.3f' % (best_move, best_pct))
         return best_move
 
+    def reuse_root(self, game_state):
+        """Detach and return the kept subtree for game_state, if there is one.
+
+        The moves played since the last search are read back through
+        previous_state until the old root's position (same object, or same
+        player to move and Zobrist hash) is found, then followed down the
+        old tree. Everything outside the returned subtree is dropped.
+        """
+        old_root = self._root
+        self._root = None
+        if old_root is None:
+            return None
+        root_state = old_root.game_state
+        if (root_state.board.num_rows, root_state.board.num_cols) != \
+                (game_state.board.num_rows, game_state.board.num_cols):
+            return None
+        root_situation = (root_state.next_player, root_state.board.zobrist_hash())
+
+        moves = []
+        state = game_state
+        while True:
+            if state is root_state or \
+                    (state.next_player, state.board.zobrist_hash()) == root_situation:
+                break
+            if len(moves) == self.max_reuse_depth or state.previous_state is None:
+                return None
+            moves.append(state.last_move)
+            state = state.previous_state
+
+        node = old_root
+        for move in reversed(moves):
+            for child in node.children:
+                if child.move == move:
+                    node = child
+                    break
+            else:
+                return None
+        node.parent = None
+        node.game_state = game_state
+        return node
+
+    def search(self, game_state, limit, root=None):
+        if root is None:
+            root = MCTSNode(game_state)
+
+        rounds_done = 0
+        while not limit.should_stop(rounds_done, root):
+            rounds_done += 1
+            node = self.select_leaf(root)
+
+            winner = self.simulate_random_game(node.game_state)
+
+            while node is not None:
+                node.record_win(winner)
+                node = node.parent
+        return root
+
+    def select_leaf(self, root):
+        node = root
+        while (not node.can_add_child()) and (not node.is_terminal()):
+            node = self.select_child(node)
+
+        if node.can_add_child():
+            node = node.add_random_child()
+        return node
+
+    def root_parallel_search(self, game_state, limit):
+        detached = detach_game_state(game_state)
+        jobs = [(detached, worker_limit, self.temperature)
+                for worker_limit in limit.split(self.num_workers)
+                if worker_limit.max_rounds != 0]
+
+        move_stats = {}
+        for worker_stats in self._get_pool().map(search_worker, jobs):
+            for move, stats in worker_stats.items():
+                if move not in move_stats:
+                    move_stats[move] = [0, 0, 0]
+                for i in range(3):
+                    move_stats[move][i] += stats[i]
+        return move_stats
+
+    def leaf_parallel_search(self, game_state, limit, root=None):
+        if root is None:
+            root = MCTSNode(game_state)
+        pool = self._get_pool()
+
+        rounds_done = 0
+        while not limit.should_stop(rounds_done, root):
+            batch_size = self.batch_size
+            if limit.max_rounds is not None:
+                batch_size = min(batch_size, limit.max_rounds - rounds_done)
+            batch = []
+            for i in range(batch_size):
+                leaf = self.select_leaf(root)
+                node = leaf
+                while node is not None:
+                    node.num_rollouts += 1
+                    node = node.parent
+                batch.append(leaf)
+
+            winners = pool.map(playout_worker,
+                               [detach_game_state(leaf.game_state) for leaf in batch])
+            for leaf, winner in zip(batch, winners):
+                node = leaf
+                while node is not None:
+                    node.win_counts[winner] += 1
+                    node = node.parent
+            rounds_done += len(batch)
+        return root
+
     def select_child(self, node):
 
         total_rollouts = sum(child.num_rollouts for child in node.children)
@@ -138,11 +335,4 @@ class MCTSAgent(agent.Agent):
 
     @staticmethod
     def simulate_random_game(game):
-        bots = {
-            Player.black: agent.FastRandomBot(),
-            Player.white: agent.FastRandomBot(),
-        }
-        while not game.is_over():
-            bot_move = bots[game.next_player].select_move(game)
-            game = game.apply_move(bot_move)
-        return game.winner()
+        return random_playout(game)
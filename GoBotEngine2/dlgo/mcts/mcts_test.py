@@ -0,0 +1,98 @@
+import random
+import unittest
+from types import SimpleNamespace
+
+from dlgo.goboard_array import GameState
+from dlgo.gotypes import Player
+from dlgo.mcts.budget import SearchBudget, SearchLimit
+from dlgo.mcts.mcts import MCTSAgent, child_stats
+
+
+class ParallelSearchTest(unittest.TestCase):
+    def test_root_parallel_counts_every_round(self):
+        bot = MCTSAgent(40, 1.4, num_workers=2)
+        try:
+            move_stats = bot.root_parallel_search(GameState.new_game(5), SearchLimit(40))
+        finally:
+            bot.close()
+        self.assertEqual(40, sum(stats[2] for stats in move_stats.values()))
+
+    def test_leaf_parallel_counts_every_round(self):
+        bot = MCTSAgent(40, 1.4, num_workers=2, parallel_mode='leaf', batch_size=8)
+        try:
+            root = bot.leaf_parallel_search(GameState.new_game(5), SearchLimit(40))
+        finally:
+            bot.close()
+        self.assertEqual(40, root.num_rollouts)
+        self.assertEqual(40, sum(root.win_counts.values()))
+        self.assertEqual(40, sum(stats[2] for stats in child_stats(root).values()))
+
+
+class BudgetTest(unittest.TestCase):
+    def test_round_cap(self):
+        bot = MCTSAgent(None, 1.4, budget=SearchBudget(max_rounds=30, early_stop=False))
+        root = bot.search(GameState.new_game(5), bot.budget.start_move(GameState.new_game(5)))
+        self.assertEqual(30, root.num_rollouts)
+
+    def test_early_stop_when_lead_is_safe(self):
+        limit = SearchLimit(max_rounds=100, early_stop=True, check_every=1)
+        safe_lead = SimpleNamespace(children=[SimpleNamespace(num_rollouts=60),
+                                              SimpleNamespace(num_rollouts=10)])
+        close_race = SimpleNamespace(children=[SimpleNamespace(num_rollouts=40),
+                                               SimpleNamespace(num_rollouts=30)])
+        self.assertTrue(limit.should_stop(70, safe_lead))
+        self.assertFalse(limit.should_stop(70, close_race))
+
+    def test_early_stop_plays_the_most_visited_move(self):
+        game = GameState.new_game(5)
+        leader, lucky = game.legal_moves()[:2]
+        root = SimpleNamespace(children=[
+            SimpleNamespace(move=leader, num_rollouts=60,
+                            win_counts={Player.black: 36, Player.white: 24}),
+            SimpleNamespace(move=lucky, num_rollouts=3,
+                            win_counts={Player.black: 3, Player.white: 0}),
+        ])
+        for early_stop, expected in ((True, leader), (False, lucky)):
+            bot = MCTSAgent(None, 1.4, reuse_tree=False,
+                            budget=SearchBudget(max_rounds=63, early_stop=early_stop))
+            bot.search = lambda game_state, limit, root_node=None: root
+            self.assertEqual(expected, bot.select_move(game))
+
+    def test_game_clock_splits_time_left(self):
+        budget = SearchBudget(game_time=50.0, min_moves_left=5)
+        # 25 empty points on 5x5 -> 12 moves left to play.
+        self.assertAlmostEqual(50.0 / 12, budget.allot_time(GameState.new_game(5)))
+        budget.min_moves_left = 20
+        budget.time_left = 2.0
+        self.assertAlmostEqual(0.1, budget.allot_time(GameState.new_game(5)))
+        budget.new_game()
+        self.assertEqual(50.0, budget.time_left)
+
+
+class TreeReuseTest(unittest.TestCase):
+    def test_reply_subtree_becomes_root(self):
+        random.seed(8)
+        bot = MCTSAgent(300, 1.4)
+        game = GameState.new_game(5)
+        move = bot.select_move(game)
+        old_root = bot._root
+        game = game.apply_move(move)
+        our_child = [c for c in old_root.children if c.move == move][0]
+        reply = our_child.children[0]
+        game = game.apply_move(reply.move)
+        carried = reply.num_rollouts
+
+        root = bot.reuse_root(game)
+        self.assertIs(reply, root)
+        self.assertIsNone(root.parent)
+        self.assertIs(game, root.game_state)
+        self.assertEqual(carried, root.num_rollouts)
+
+    def test_unrelated_position_starts_fresh(self):
+        bot = MCTSAgent(50, 1.4)
+        bot.select_move(GameState.new_game(5))
+        self.assertIsNone(bot.reuse_root(GameState.new_game(7)))
+
+
+if __name__ == '__main__':
+    unittest.main()
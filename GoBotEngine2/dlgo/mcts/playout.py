@@ -0,0 +1,176 @@
+import random
+
+import numpy as np
+
+from dlgo.goboard_array import BLACK, WHITE, EMPTY, OFF_BOARD, COLOR_TO_PLAYER, copy_board
+from dlgo.goboard_fast import Move
+from dlgo.scoring import GameResult
+
+__all__ = [
+    'random_playout',
+    'score_board',
+]
+
+
+def _is_eye(colors, index, color, stride):
+    for neighbor in (index - stride, index + stride, index - 1, index + 1):
+        neighbor_color = colors[neighbor]
+        if neighbor_color != color and neighbor_color != OFF_BOARD:
+            return False
+    friendly_corners = 0
+    off_board_corners = 0
+    for corner in (index - stride - 1, index - stride + 1,
+                   index + stride - 1, index + stride + 1):
+        corner_color = colors[corner]
+        if corner_color == color:
+            friendly_corners += 1
+        elif corner_color == OFF_BOARD:
+            off_board_corners += 1
+    if off_board_corners > 0:
+        return off_board_corners + friendly_corners == 4
+    return friendly_corners >= 3
+
+
+def score_board(board):
+    """Area score of an array board, as evaluate_territory counts it.
+
+    Returns (black_points, white_points, owner) where owner maps each
+    board index to BLACK, WHITE or EMPTY for dame.
+    """
+    colors = board._colors
+    stride = board._geometry.stride
+    owner = [EMPTY] * board._geometry.size
+    visited = bytearray(board._geometry.size)
+    points = {BLACK: 0, WHITE: 0}
+    for index in board._geometry.on_board:
+        color = colors[index]
+        if color != EMPTY:
+            owner[index] = color
+            points[color] += 1
+            continue
+        if visited[index]:
+            continue
+        region = []
+        borders = 0
+        stack = [index]
+        visited[index] = 1
+        while stack:
+            point = stack.pop()
+            region.append(point)
+            for neighbor in (point - stride, point + stride, point - 1, point + 1):
+                neighbor_color = colors[neighbor]
+                if neighbor_color == EMPTY:
+                    if not visited[neighbor]:
+                        visited[neighbor] = 1
+                        stack.append(neighbor)
+                elif neighbor_color != OFF_BOARD:
+                    borders |= neighbor_color
+        if borders == BLACK or borders == WHITE:
+            points[borders] += len(region)
+            for point in region:
+                owner[point] = borders
+    return points[BLACK], points[WHITE], owner
+
+
+def _ownership_map(board, owner):
+    ownership = np.zeros((board.num_rows, board.num_cols), dtype=np.int8)
+    values = {BLACK: 1, WHITE: -1, EMPTY: 0}
+    flat = ownership.reshape(-1)
+    for i, index in enumerate(board._geometry.on_board):
+        flat[i] = values[owner[index]]
+    return ownership
+
+
+def random_playout(game_state, max_moves=None, return_ownership=False):
+    """Play random moves from game_state to the end of the game.
+
+    Moves follow the FastRandomBot policy: uniformly random legal points
+    that do not fill the mover's own eye, passing when none are left. The
+    game is played on one scratch array board, keeping a list of empty
+    points and using simple ko after the first move. Play stops after
+    max_moves (three times the board area by default) to cut off cycles
+    simple ko does not catch.
+
+    Returns the winning Player, or (winner, ownership) if
+    return_ownership is set, where ownership is a (num_rows, num_cols)
+    int8 array of 1 for black, -1 for white and 0 for dame.
+    """
+    board = copy_board(game_state.board)
+    if game_state.is_over():
+        winner = game_state.winner()
+        if not return_ownership:
+            return winner
+        _, _, owner = score_board(board)
+        return winner, _ownership_map(board, owner)
+
+    geometry = board._geometry
+    stride = geometry.stride
+    colors = board._colors
+    string_id = board._string_id
+    next_stone = board._next_stone
+    num_stones = board._num_stones
+    num_liberties = board._num_liberties
+    randrange = random.randrange
+
+    empty = [index for index in geometry.on_board if colors[index] == EMPTY]
+    empty_position = [0] * geometry.size
+    for position, index in enumerate(empty):
+        empty_position[index] = position
+
+    if max_moves is None:
+        max_moves = 3 * len(geometry.on_board)
+    color = game_state.next_player.value
+    last_move = game_state.last_move
+    passes = 1 if last_move is not None and last_move.is_pass else 0
+    ko_point = None
+    num_moves = 0
+    while passes < 2 and num_moves < max_moves:
+        candidates = len(empty)
+        played = None
+        while candidates:
+            position = randrange(candidates)
+            index = empty[position]
+            if index != ko_point and \
+                    not _is_eye(colors, index, color, stride) and \
+                    not board._is_self_capture(color, index) and \
+                    not (num_moves == 0 and board._will_capture(color, index) and
+                         game_state.does_move_violate_ko(
+                             COLOR_TO_PLAYER[color], Move.play(geometry.points[index]))):
+                played = index
+                break
+            # Move the rejected point behind the candidates still to try.
+            candidates -= 1
+            other = empty[candidates]
+            empty[position], empty[candidates] = other, index
+            empty_position[other], empty_position[index] = position, candidates
+
+        ko_point = None
+        if played is None:
+            passes += 1
+        else:
+            passes = 0
+            captures = board._place(color, played)[5]
+            last = empty.pop()
+            if last != played:
+                position = empty_position[played]
+                empty[position] = last
+                empty_position[last] = position
+            for root in captures:
+                stone = root
+                while True:
+                    empty_position[stone] = len(empty)
+                    empty.append(stone)
+                    stone = next_stone[stone]
+                    if stone == root:
+                        break
+            if len(captures) == 1 and num_stones[captures[0]] == 1 and \
+                    num_stones[string_id[played]] == 1 and num_liberties[played] == 1:
+                ko_point = captures[0]
+        color = BLACK + WHITE - color
+        num_moves += 1
+
+    black_points, white_points, owner = score_board(board)
+    winner = GameResult(black_points, white_points, komi=7.5).winner
+    if return_ownership:
+        return winner, _ownership_map(board, owner)
+    return winner
@@ -0,0 +1,39 @@
+import random
+import unittest
+
+from dlgo.goboard_array import GameState, Move, copy_board
+from dlgo.gotypes import Player, Point
+from dlgo.mcts.playout import random_playout, score_board
+from dlgo.scoring import compute_game_result
+
+
+class PlayoutTest(unittest.TestCase):
+    def test_score_matches_compute_game_result(self):
+        random.seed(5)
+        game = GameState.new_game(9)
+        for _ in range(60):
+            game = game.apply_move(random.choice(game.legal_moves()[:-2]))
+        black, white, _ = score_board(copy_board(game.board))
+        result = compute_game_result(game)
+        self.assertEqual((result.b, result.w), (black, white))
+
+    def test_finished_game_keeps_its_winner(self):
+        game = GameState.new_game(5)
+        game = game.apply_move(Move.play(Point(3, 3)))
+        game = game.apply_move(Move.resign())
+        self.assertEqual(Player.black, random_playout(game))
+
+    def test_ownership_covers_the_board(self):
+        random.seed(6)
+        game = GameState.new_game(7)
+        winner, ownership = random_playout(game, return_ownership=True)
+        self.assertIn(winner, (Player.black, Player.white))
+        self.assertEqual((7, 7), ownership.shape)
+        black_area = (ownership == 1).sum()
+        white_area = (ownership == -1).sum()
+        expected = Player.black if black_area > white_area + 7.5 else Player.white
+        self.assertEqual(expected, winner)
+
+
+if __name__ == '__main__':
+    unittest.main()
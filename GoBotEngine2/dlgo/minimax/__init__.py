@@ -1,3 +1,5 @@
 from .alphabeta import *
 from .depthprune import *
 from .minimax import *
+from .transposition import *
+from .evaluation import *
@@ -1,17 +1,97 @@
+import multiprocessing
 import random
+import time
 
 from dlgo.agent import Agent
+from dlgo.goboard_array import SearchState
+from dlgo.goboard_fast import detach_game_state
 from dlgo.gotypes import Player
+from dlgo.minimax.transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
 
 __all__ = [
     'AlphaBetaAgent',
+    'MoveOrdering',
+    'SearchTimeout',
 ]
 
 MAX_SCORE = 999999
 MIN_SCORE = -999999
 
 
-def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn):
+class SearchTimeout(Exception):
+    pass
+
+
+class MoveOrdering:
+    """Move ordering and deadline for one iterative-deepening search.
+
+    Moves are tried in this order: the principal variation of the last
+    completed iteration while the search is still following it, the
+    transposition table move, the two killer moves stored for the ply,
+    then the rest by history score. Plies are counted by
+    SearchState.depth.
+
+    Once deadline passes, the next node raises SearchTimeout.
+    """
+
+    def __init__(self, deadline=None, check_every=64):
+        self.deadline = deadline
+        self.check_every = check_every
+        self.nodes = 0
+        self.pv = []
+        self.follow_pv = False
+        self.killers = {}
+        self.history = {}
+
+    def start_iteration(self, pv):
+        self.pv = pv
+        self.follow_pv = bool(pv)
+
+    def visit(self):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % self.check_every == 0 and \
+                time.time() >= self.deadline:
+            raise SearchTimeout()
+
+    def order(self, moves, ply, table_move=None):
+        first = []
+        if self.follow_pv:
+            if ply < len(self.pv) and self.pv[ply] in moves:
+                first.append(self.pv[ply])
+            else:
+                self.follow_pv = False
+        if table_move is not None and table_move not in first and table_move in moves:
+            first.append(table_move)
+        for killer in self.killers.get(ply, ()):
+            if killer not in first and killer in moves:
+                first.append(killer)
+        history = self.history
+        rest = [move for move in moves if move not in first]
+        rest.sort(key=lambda move: history.get(move, 0), reverse=True)
+        return first + rest
+
+    def cutoff(self, move, ply, depth):
+        if move.is_pass:
+            return
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+def order_moves(moves, first_move):
+    if first_move is not None and first_move in moves:
+        moves.remove(first_move)
+        moves.insert(0, first_move)
+    return moves
+
+
+def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn, table=None,
+                      ordering=None):
+    if ordering is not None:
+        ordering.visit()
+
     if game_state.is_over():
         if game_state.winner() == game_state.next_player:
             return MAX_SCORE
@@ -21,23 +101,58 @@ def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn):
     if max_depth == 0:
         return eval_fn(game_state)
 
+    if game_state.next_player == Player.black:
+        alpha, beta = best_black, -best_white
+    else:
+        alpha, beta = best_white, -best_black
+    # Probe before generating moves, so a table cutoff costs no move
+    # generation.
+    table_move = None
+    if table is not None:
+        key = table.key(game_state)
+        entry = table.probe(key)
+        if entry is not None:
+            _, depth, bound, value, table_move, _ = entry
+            if depth >= max_depth:
+                # Strict, like the cutoffs below: a bound on the window's
+                # edge may hide a move that ties the best score, and the
+                # root would then count a worse move among the best.
+                if bound == EXACT or \
+                        (bound == LOWER_BOUND and value > beta) or \
+                        (bound == UPPER_BOUND and value < alpha):
+                    return value
+    moves = game_state.legal_moves()
+    if ordering is not None:
+        moves = ordering.order(moves, game_state.depth, table_move)
+    else:
+        order_moves(moves, table_move)
+
     best_so_far = MIN_SCORE
-    for candidate_move in game_state.legal_moves():
-        next_state = game_state.apply_move(candidate_move)
+    best_move = None
+    for candidate_move in moves:
+        game_state.make_move(candidate_move)
         opponent_best_result = alpha_beta_result(
-            next_state, max_depth - 1,
+            game_state, max_depth - 1,
             best_black, best_white,
-            eval_fn)
+            eval_fn, table, ordering)
+        game_state.unmake_move()
         our_result = -1 * opponent_best_result
+        if ordering is not None:
+            ordering.follow_pv = False
 
         if our_result > best_so_far:
             best_so_far = our_result
+            best_move = candidate_move
 
         if game_state.next_player == Player.white:
             if best_so_far > best_white:
                 best_white = best_so_far
             outcome_for_black = -1 * best_so_far
             if outcome_for_black < best_black:
+                if ordering is not None:
+                    ordering.cutoff(candidate_move, game_state.depth, max_depth)
+                if table is not None:
+                    table.store(key, max_depth, LOWER_BOUND, best_so_far, best_move)
                 return best_so_far
 
         elif game_state.next_player == Player.black:
@@ -45,43 +160,225 @@ def alpha_beta_result(game_state, max_depth, best_black, best_white, eval_fn):
                 best_black = best_so_far
             outcome_for_white = -1 * best_so_far
             if outcome_for_white < best_white:
+                if ordering is not None:
+                    ordering.cutoff(candidate_move, game_state.depth, max_depth)
+                if table is not None:
+                    table.store(key, max_depth, LOWER_BOUND, best_so_far, best_move)
                 return best_so_far
 
+    if table is not None:
+        if best_so_far <= alpha:
+            table.store(key, max_depth, UPPER_BOUND, best_so_far, None)
+        else:
+            table.store(key, max_depth, EXACT, best_so_far, best_move)
     return best_so_far
 
 
+def principal_variation(game_state, table, first_move, max_length):
+    """Follow the table's best moves from the position after first_move."""
+    pv = [first_move]
+    game_state.make_move(first_move)
+    while len(pv) < max_length and not game_state.is_over():
+        entry = table.probe(table.key(game_state))
+        if entry is None or entry[4] is None or \
+                not game_state.is_valid_move(entry[4]):
+            break
+        pv.append(entry[4])
+        game_state.make_move(entry[4])
+    for _ in pv:
+        game_state.unmake_move()
+    return pv
+
+
+_shared_bound = None
+_worker_table = None
+
+
+def init_worker(shared_bound, table_size):
+    global _shared_bound, _worker_table
+    _shared_bound = shared_bound
+    _worker_table = None if table_size is None else TranspositionTable(table_size)
+
+
+def root_move_worker(args):
+    """Score one root move, pruning against the best score found so far.
+
+    The bound is lowered by one so that a move tied with the best still
+    gets its exact score and the set of best moves does not depend on the
+    order the workers finish in. Returns None if the deadline passed.
+    """
+    game_state, move, depth, eval_fn, deadline, pv, generation = args
+    search_state = SearchState.from_game_state(game_state)
+    best_black = MIN_SCORE
+    best_white = MIN_SCORE
+    bound = max(_shared_bound.value - 1, MIN_SCORE)
+    if search_state.next_player == Player.black:
+        best_black = bound
+    else:
+        best_white = bound
+    if _worker_table is not None:
+        _worker_table.generation = generation
+    ordering = MoveOrdering(deadline)
+    ordering.start_iteration(pv)
+
+    search_state.make_move(move)
+    try:
+        score = -1 * alpha_beta_result(
+            search_state, depth,
+            best_black, best_white,
+            eval_fn, _worker_table, ordering)
+    except SearchTimeout:
+        return None
+    with _shared_bound.get_lock():
+        if score > _shared_bound.value:
+            _shared_bound.value = score
+    return score
+
+
 class AlphaBetaAgent(Agent):
-    def __init__(self, max_depth, eval_fn):
+    """Alpha-beta search to max_depth.
+
+    Positions seen during a search are cached in a transposition table of
+    table_size entries that is kept between moves; pass table_size=None
+    to search without one.
+
+    The search deepens one ply at a time up to max_depth, ordering moves
+    with the previous iteration's principal variation, killer moves and
+    the history heuristic. With time_limit, in seconds, the search stops
+    once the time is used up and plays the best move of the last depth it
+    completed; max_depth may then be None to search as deep as time
+    allows. The depth reached is kept in completed_depth.
+
+    With num_workers > 1 the root moves of each iteration are searched in
+    a process pool. Workers share the best root score so far to prune
+    against and keep their own transposition tables; eval_fn must be
+    picklable and return integer scores. The pool lives until close() is
+    called, so call it when done, or use the agent in a with statement.
+    """
+
+    def __init__(self, max_depth, eval_fn, table_size=1 << 16, time_limit=None,
+                 num_workers=1):
         Agent.__init__(self)
+        if max_depth is None and time_limit is None:
+            raise ValueError('AlphaBetaAgent needs a max_depth or a time_limit')
         self.max_depth = max_depth
         self.eval_fn = eval_fn
+        self.table = None if table_size is None else TranspositionTable(table_size)
+        self.time_limit = time_limit
+        self.completed_depth = None
+        self.table_size = table_size
+        self.num_workers = num_workers
+        self._shared_bound = None
+        self._pool = None
+        self._generation = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._shared_bound = multiprocessing.Value('i', MIN_SCORE)
+            self._pool = multiprocessing.Pool(processes=self.num_workers,
+                                              initializer=init_worker,
+                                              initargs=(self._shared_bound, self.table_size))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def select_move(self, game_state):
+        search_state = SearchState.from_game_state(game_state)
+        if self.table is not None:
+            self.table.new_search()
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.time() + self.time_limit
+        # The first iteration always completes so there is a move to play.
+        ordering = MoveOrdering()
+        self._generation += 1
+
+        moves = search_state.legal_moves()
+        best_moves = moves
+        pv = []
+        self.completed_depth = None
+        depth = 0
+        while self.max_depth is None or depth <= self.max_depth:
+            ordering.start_iteration(pv)
+            try:
+                if self.num_workers > 1:
+                    best_moves, best_score, scores = self.parallel_search_root(
+                        game_state, moves, depth, ordering.deadline, pv)
+                else:
+                    best_moves, best_score, scores = self.search_root(
+                        search_state, moves, depth, ordering)
+            except SearchTimeout:
+                # search_state is left mid-line; it is not used again.
+                break
+            self.completed_depth = depth
+            if abs(best_score) == MAX_SCORE:
+                break
+            moves = sorted(moves, key=lambda move: scores[move], reverse=True)
+            if self.table is not None:
+                pv = principal_variation(search_state, self.table, best_moves[0], depth + 1)
+            else:
+                pv = [best_moves[0]]
+            ordering.deadline = deadline
+            depth += 1
+
+        return random.choice(best_moves)
+
+    def search_root(self, search_state, moves, depth, ordering):
         best_moves = []
         best_score = None
         best_black = MIN_SCORE
         best_white = MIN_SCORE
+        scores = {}
 
-        for possible_move in game_state.legal_moves():
-
-            next_state = game_state.apply_move(possible_move)
+        # Root moves come sorted by the previous iteration's scores.
+        for possible_move in moves:
 
+            search_state.make_move(possible_move)
             opponent_best_outcome = alpha_beta_result(
-                next_state, self.max_depth,
+                search_state, depth,
                 best_black, best_white,
-                self.eval_fn)
+                self.eval_fn, self.table, ordering)
+            search_state.unmake_move()
+            ordering.follow_pv = False
 
             our_best_outcome = -1 * opponent_best_outcome
+            scores[possible_move] = our_best_outcome
             if (not best_moves) or our_best_outcome > best_score:
 
                 best_moves = [possible_move]
                 best_score = our_best_outcome
-                if game_state.next_player == Player.black:
+                if search_state.next_player == Player.black:
                     best_black = best_score
-                elif game_state.next_player == Player.white:
+                elif search_state.next_player == Player.white:
                     best_white = best_score
             elif our_best_outcome == best_score:
 
                 best_moves.append(possible_move)
 
-        return random.choice(best_moves)
+        return best_moves, best_score, scores
+
+    def parallel_search_root(self, game_state, moves, depth, deadline, pv):
+        pool = self._get_pool()
+        self._shared_bound.value = MIN_SCORE
+        detached = detach_game_state(game_state)
+        jobs = [(detached, move, depth, self.eval_fn, deadline,
+                 pv if pv and pv[0] == move else [], self._generation)
+                for move in moves]
+        results = pool.map(root_move_worker, jobs, chunksize=1)
+        if any(score is None for score in results):
+            raise SearchTimeout()
+
+        scores = dict(zip(moves, results))
+        best_score = max(results)
+        best_moves = [move for move in moves if scores[move] == best_score]
+        return best_moves, best_score, scores
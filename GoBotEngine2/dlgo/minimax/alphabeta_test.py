@@ -0,0 +1,94 @@
+import time
+import unittest
+from unittest import mock
+
+from dlgo.goboard_array import GameState, Move, SearchState
+from dlgo.gotypes import Point
+from dlgo.minimax.alphabeta import AlphaBetaAgent, MoveOrdering, SearchTimeout
+from dlgo.minimax.depthprune import best_result
+from dlgo.minimax.helpers_test import random_position, stone_diff
+
+
+class MoveOrderingTest(unittest.TestCase):
+    def test_order(self):
+        moves = [Move.play(Point(1, col)) for col in range(1, 6)] + [Move.pass_turn()]
+        ordering = MoveOrdering()
+        ordering.start_iteration([moves[0], moves[4]])
+        ordering.cutoff(moves[3], 1, 2)
+        ordering.cutoff(moves[2], 2, 3)
+        ordering.cutoff(moves[5], 1, 1)
+        ordered = ordering.order(list(moves), 1, table_move=moves[1])
+        # PV move, table move, killer, then history.
+        self.assertEqual(moves[4], ordered[0])
+        self.assertEqual(moves[1], ordered[1])
+        self.assertEqual(moves[3], ordered[2])
+        self.assertEqual(moves[2], ordered[3])
+        self.assertEqual(sorted(moves, key=str), sorted(ordered, key=str))
+
+    def test_timeout(self):
+        ordering = MoveOrdering(deadline=time.time() - 1, check_every=1)
+        with self.assertRaises(SearchTimeout):
+            ordering.visit()
+
+
+def exact_root_scores(game, depth):
+    search_state = SearchState.from_game_state(game)
+    scores = {}
+    for move in search_state.legal_moves():
+        search_state.make_move(move)
+        scores[move] = -best_result(search_state, depth, stone_diff)
+        search_state.unmake_move()
+    return scores
+
+
+class IterativeDeepeningTest(unittest.TestCase):
+    def test_root_score_matches_full_width_search(self):
+        game = random_position(3)
+        search_state = SearchState.from_game_state(game)
+        expected = max(exact_root_scores(game, 2).values())
+
+        bot = AlphaBetaAgent(2, stone_diff)
+        move = bot.select_move(game)
+        self.assertTrue(game.is_valid_move(move))
+        self.assertEqual(2, bot.completed_depth)
+        _, best_score, _ = bot.search_root(
+            search_state, search_state.legal_moves(), 2, MoveOrdering())
+        self.assertEqual(expected, best_score)
+
+    def test_chosen_move_has_the_best_exact_score(self):
+        game = random_position(16, 4)
+        exact = exact_root_scores(game, 3)
+        expected = max(exact.values())
+        with mock.patch('random.choice', side_effect=lambda moves: moves[-1]) as choice:
+            move = AlphaBetaAgent(3, stone_diff).select_move(game)
+        self.assertEqual(expected, exact[move])
+        # Table bounds on the window's edge once let worse moves tie.
+        self.assertEqual([expected] * len(choice.call_args[0][0]),
+                         [exact[candidate] for candidate in choice.call_args[0][0]])
+
+    def test_time_limit(self):
+        bot = AlphaBetaAgent(None, stone_diff, time_limit=0.3)
+        game = GameState.new_game(5)
+        start = time.time()
+        move = bot.select_move(game)
+        self.assertLess(time.time() - start, 2.0)
+        self.assertTrue(game.is_valid_move(move))
+        self.assertGreaterEqual(bot.completed_depth, 1)
+
+
+class ParallelRootTest(unittest.TestCase):
+    def test_parallel_root_finds_every_best_move(self):
+        game = random_position(4)
+        exact = exact_root_scores(game, 1)
+        expected = max(exact.values())
+        moves = game.legal_moves()
+        with AlphaBetaAgent(1, stone_diff, num_workers=2) as bot:
+            best_moves, best_score, _ = bot.parallel_search_root(game, moves, 1, None, [])
+            self.assertIsNotNone(bot._pool)
+        self.assertIsNone(bot._pool)
+        self.assertEqual(expected, best_score)
+        self.assertEqual([move for move in moves if exact[move] == expected], best_moves)
+
+
+if __name__ == '__main__':
+    unittest.main()
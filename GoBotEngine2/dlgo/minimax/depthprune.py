@@ -1,6 +1,10 @@
+import multiprocessing
 import random
 
 from dlgo.agent import Agent
+from dlgo.goboard_array import SearchState
+from dlgo.goboard_fast import detach_game_state
+from dlgo.minimax.transposition import EXACT, TranspositionTable
 from dlgo.scoring import GameResult
 
 __all__ = [
@@ -20,7 +24,7 @@ def reverse_game_result(game_result):
 
 
 # tag::depth-prune[]
-def best_result(game_state, max_depth, eval_fn):
+def best_result(game_state, max_depth, eval_fn, table=None):
     if game_state.is_over():
         if game_state.winner() == game_state.next_player:
             return MAX_SCORE
@@ -30,33 +34,100 @@ def best_result(game_state, max_depth, eval_fn):
     if max_depth == 0:
         return eval_fn(game_state)
 
+    if table is not None:
+        key = table.key(game_state)
+        entry = table.probe(key)
+        if entry is not None and entry[1] >= max_depth and entry[2] == EXACT:
+            return entry[3]
+
     best_so_far = MIN_SCORE
+    best_move = None
     for candidate_move in game_state.legal_moves():
-        next_state = game_state.apply_move(candidate_move)
+        game_state.make_move(candidate_move)
         opponent_best_result = best_result(
-            next_state, max_depth - 1, eval_fn)
+            game_state, max_depth - 1, eval_fn, table)
+        game_state.unmake_move()
         our_result = -1 * opponent_best_result
         if our_result > best_so_far:
             best_so_far = our_result
+            best_move = candidate_move
 
+    if table is not None:
+        table.store(key, max_depth, EXACT, best_so_far, best_move)
     return best_so_far
 
 
+_worker_table = None
+
+
+def init_worker(table_size):
+    global _worker_table
+    _worker_table = None if table_size is None else TranspositionTable(table_size)
+
+
+def root_move_worker(args):
+    game_state, move, max_depth, eval_fn = args
+    search_state = SearchState.from_game_state(game_state)
+    if _worker_table is not None:
+        _worker_table.new_search()
+    search_state.make_move(move)
+    return -1 * best_result(search_state, max_depth, eval_fn, _worker_table)
+
+
 class DepthPrunedAgent(Agent):
-    def __init__(self, max_depth, eval_fn):
+    """Full-width search to max_depth.
+
+    Transpositions are scored once per search through a table of
+    table_size entries; pass table_size=None to search without one.
+
+    With num_workers > 1 the root moves are scored in a process pool,
+    each worker with its own table; eval_fn must be picklable. The pool
+    lives until close() is called, so call it when done, or use the agent
+    in a with statement.
+    """
+
+    def __init__(self, max_depth, eval_fn, table_size=1 << 16, num_workers=1):
         Agent.__init__(self)
         self.max_depth = max_depth
         self.eval_fn = eval_fn
+        self.table = None if table_size is None else TranspositionTable(table_size)
+        self.table_size = table_size
+        self.num_workers = num_workers
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(processes=self.num_workers,
+                                              initializer=init_worker,
+                                              initargs=(self.table_size,))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def select_move(self, game_state):
+        if self.num_workers > 1:
+            return self.parallel_select_move(game_state)
         best_moves = []
         best_score = None
+        search_state = SearchState.from_game_state(game_state)
+        if self.table is not None:
+            self.table.new_search()
 
-        for possible_move in game_state.legal_moves():
-
-            next_state = game_state.apply_move(possible_move)
+        for possible_move in search_state.legal_moves():
 
-            opponent_best_outcome = best_result(next_state, self.max_depth, self.eval_fn)
+            search_state.make_move(possible_move)
+            opponent_best_outcome = best_result(search_state, self.max_depth, self.eval_fn, self.table)
+            search_state.unmake_move()
 
             our_best_outcome = -1 * opponent_best_outcome
             if (not best_moves) or our_best_outcome > best_score:
@@ -68,3 +139,13 @@ class DepthPrunedAgent(Agent):
                 best_moves.append(possible_move)
 
         return random.choice(best_moves)
+
+    def parallel_select_move(self, game_state):
+        moves = game_state.legal_moves()
+        detached = detach_game_state(game_state)
+        jobs = [(detached, move, self.max_depth, self.eval_fn) for move in moves]
+        scores = self._get_pool().map(root_move_worker, jobs, chunksize=1)
+
+        best_score = max(scores)
+        best_moves = [move for move, score in zip(moves, scores) if score == best_score]
+        return random.choice(best_moves)
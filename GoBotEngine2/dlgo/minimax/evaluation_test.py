@@ -0,0 +1,30 @@
+import random
+import unittest
+
+from dlgo.goboard_array import GameState
+from dlgo.gotypes import Player
+from dlgo.minimax.evaluation import CaptureDiff, capture_diff
+from dlgo.minimax.helpers_test import stone_diff
+
+
+class CaptureDiffTest(unittest.TestCase):
+    def test_matches_board_scan(self):
+        random.seed(9)
+        game = GameState.new_game(5)
+        while not game.is_over():
+            self.assertEqual(stone_diff(game), capture_diff(game))
+            game = game.apply_move(random.choice(game.legal_moves()[:-1]))
+
+    def test_capture_weight(self):
+        random.seed(10)
+        game = GameState.new_game(5)
+        while game.board.capture_count(Player.black) + game.board.capture_count(Player.white) == 0:
+            game = game.apply_move(random.choice(game.legal_moves()[:-1]))
+        board = game.board
+        player = game.next_player
+        captures = board.capture_count(player) - board.capture_count(player.other)
+        self.assertEqual(capture_diff(game) + 2 * captures, CaptureDiff(capture_weight=2)(game))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import random
+
+from dlgo.goboard_array import GameState
+from dlgo.gotypes import Player, Point
+
+
+def stone_diff(game_state):
+    """Stones of the player to move minus the opponent's, by a board scan."""
+    black = white = 0
+    for row in range(1, game_state.board.num_rows + 1):
+        for col in range(1, game_state.board.num_cols + 1):
+            color = game_state.board.get(Point(row, col))
+            if color == Player.black:
+                black += 1
+            elif color == Player.white:
+                white += 1
+    diff = black - white
+    return diff if game_state.next_player == Player.black else -diff
+
+
+def random_position(seed, num_moves=5):
+    """A 4x4 game after num_moves random moves, none of them a pass."""
+    random.seed(seed)
+    game = GameState.new_game(4)
+    for _ in range(num_moves):
+        game = game.apply_move(random.choice(game.legal_moves()[:-2]))
+    return game
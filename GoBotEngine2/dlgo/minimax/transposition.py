@@ -0,0 +1,59 @@
+__all__ = [
+    'TranspositionTable',
+]
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by position.
+
+    Each key maps to one slot. A slot is overwritten by a result from a
+    newer search or by one searched at least as deep; otherwise the
+    deeper entry of the current search is kept.
+
+    Entries are (key, depth, bound, value, best_move, generation) where
+    bound says whether value is EXACT, a LOWER_BOUND or an UPPER_BOUND on
+    the true score for the player to move.
+    """
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+
+    def new_search(self):
+        """Mark existing entries as old so they are replaced first."""
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * self.size
+
+    @staticmethod
+    def key(game_state):
+        """Zobrist hash, player to move and whether the last move passed.
+
+        The pass flag keeps positions one pass from the end of the game
+        apart from the same stones reached by play. Superko history is not
+        part of the key.
+        """
+        last_move = game_state.last_move
+        return (game_state.board.zobrist_hash(), game_state.next_player,
+                last_move is not None and last_move.is_pass)
+
+    def probe(self, key):
+        entry = self.slots[hash(key) % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, bound, value, best_move):
+        index = hash(key) % self.size
+        entry = self.slots[index]
+        if entry is None or entry[5] != self.generation or depth >= entry[1]:
+            self.slots[index] = (key, depth, bound, value, best_move, self.generation)
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
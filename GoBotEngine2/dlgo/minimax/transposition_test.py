@@ -0,0 +1,50 @@
+import unittest
+
+from dlgo.goboard_array import SearchState
+from dlgo.minimax.alphabeta import MIN_SCORE, alpha_beta_result
+from dlgo.minimax.depthprune import best_result
+from dlgo.minimax.helpers_test import random_position, stone_diff
+from dlgo.minimax.transposition import EXACT, LOWER_BOUND, TranspositionTable
+
+
+class TranspositionTableTest(unittest.TestCase):
+    def test_replacement_keeps_deeper_entry_of_current_search(self):
+        table = TranspositionTable(1)
+        table.store('a', 3, EXACT, 5, None)
+        table.store('b', 1, EXACT, 7, None)
+        self.assertIsNone(table.probe('b'))
+        self.assertEqual(5, table.probe('a')[3])
+        table.new_search()
+        table.store('b', 1, LOWER_BOUND, 7, None)
+        self.assertIsNone(table.probe('a'))
+        self.assertEqual(7, table.probe('b')[3])
+
+    def test_alpha_beta_value_is_unchanged(self):
+        for seed in range(3):
+            game = random_position(seed, 4)
+            expected = alpha_beta_result(
+                SearchState.from_game_state(game), 2, MIN_SCORE, MIN_SCORE, stone_diff)
+            table = TranspositionTable()
+            actual = alpha_beta_result(
+                SearchState.from_game_state(game), 2, MIN_SCORE, MIN_SCORE, stone_diff, table)
+            self.assertEqual(expected, actual)
+            self.assertGreater(len(table), 0)
+            # A second search is answered from the table, without
+            # generating moves.
+            search_state = SearchState.from_game_state(game)
+            generated = []
+            legal_moves = search_state.legal_moves
+            search_state.legal_moves = lambda: generated.append(1) or legal_moves()
+            again = alpha_beta_result(search_state, 2, MIN_SCORE, MIN_SCORE, stone_diff, table)
+            self.assertEqual(expected, again)
+            self.assertEqual([], generated)
+
+    def test_depth_pruned_value_is_unchanged(self):
+        game = random_position(4, 4)
+        expected = best_result(SearchState.from_game_state(game), 2, stone_diff)
+        actual = best_result(SearchState.from_game_state(game), 2, stone_diff, TranspositionTable())
+        self.assertEqual(expected, actual)
+
+
+if __name__ == '__main__':
+    unittest.main()
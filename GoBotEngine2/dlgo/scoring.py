@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 from collections import namedtuple
 
+import numpy as np
+
 from dlgo.gotypes import Player, Point
 
 
@@ -45,51 +47,98 @@ class GameResult(namedtuple('GameResult', 'b w komi')):
         return 'W+%.1f' % (w - self.b,)
 
 
-def evaluate_territory(board):
-    status = {}
+# Cell values of the grids scored below, matching goboard_array.
+_EMPTY = 0
+_BLACK = Player.black.value
+_WHITE = Player.white.value
+_OFF_BOARD = 3
+
+
+def _color_grid(board):
+    """Padded (num_rows + 2, num_cols + 2) int8 grid of the board's colors."""
+    if hasattr(board, 'color_grid'):
+        return board.color_grid()
+    grid = np.full((board.num_rows + 2, board.num_cols + 2), _OFF_BOARD, dtype=np.int8)
     for r in range(1, board.num_rows + 1):
         for c in range(1, board.num_cols + 1):
-            p = Point(row=r, col=c)
-            if p in status:
-                continue
-            stone = board.get(p)
-            if stone is not None:
-                status[p] = board.get(p)
-            else:
-                group, neighbors = _collect_region(p, board)
-                if len(neighbors) == 1:
-                    neighbor_stone = neighbors.pop()
-                    stone_str = 'b' if neighbor_stone == Player.black else 'w'
-                    fill_with = 'territory_' + stone_str
-                else:
-                    fill_with = 'dame'
-                for pos in group:
-                    status[pos] = fill_with
-    return Territory(status)
-
-
-def _collect_region(start_pos, board, visited=None):
-    if visited is None:
-        visited = {}
-    if start_pos in visited:
-        return [], set()
-    all_points = [start_pos]
-    all_borders = set()
-    visited[start_pos] = True
-    here = board.get(start_pos)
-    deltas = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    for delta_r, delta_c in deltas:
-        next_p: Point = Point(row=start_pos.row + delta_r, col=start_pos.col + delta_c)
-        if not board.is_on_grid(next_p):
-            continue
-        neighbor = board.get(next_p)
-        if neighbor == here:
-            points, borders = _collect_region(next_p, board, visited)
-            all_points += points
-            all_borders |= borders
-        else:
-            all_borders.add(neighbor)
-    return all_points, all_borders
+            stone = board.get(Point(row=r, col=c))
+            grid[r, c] = _EMPTY if stone is None else stone.value
+    return grid
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _label_empty_regions(empty):
+    """Label the 4-connected components of a boolean grid.
+
+    Horizontal runs of empty points are found with NumPy, and runs that
+    touch vertically are joined with a union-find over runs, so nothing
+    recurses and the Python loop is over runs rather than points.
+    Returns (labels, num_labels): every point of a region carries the same
+    label in 0..num_labels-1, not every label is used, and points that are
+    not empty carry 0.
+    """
+    starts = empty.copy()
+    starts[:, 1:] &= ~empty[:, :-1]
+    run_ids = np.cumsum(starts.ravel()).reshape(empty.shape) - 1
+    num_runs = int(run_ids[-1, -1]) + 1
+
+    parent = list(range(num_runs))
+    vertical = empty[:-1, :] & empty[1:, :]
+    above = run_ids[:-1, :][vertical].tolist()
+    below = run_ids[1:, :][vertical].tolist()
+    for a, b in zip(above, below):
+        root_a = _find(parent, a)
+        root_b = _find(parent, b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    roots = np.array([_find(parent, i) for i in range(num_runs)], dtype=np.intp)
+    labels = np.where(empty, roots[np.maximum(run_ids, 0)], 0)
+    return labels, num_runs
+
+
+def evaluate_territory(board):
+    """Count stones, territory and dame of a finished game.
+
+    Empty regions are labeled as connected components, and each region
+    ORs together the colors of the stones around it: a region bordered by
+    one color only is that color's territory, anything else is dame.
+    Works on a NumPy grid, so large empty regions cost no recursion.
+    """
+    grid = _color_grid(board)
+    inner = grid[1:-1, 1:-1]
+    empty = inner == _EMPTY
+
+    territory = Territory({})
+    territory.num_black_stones = int(np.count_nonzero(inner == _BLACK))
+    territory.num_white_stones = int(np.count_nonzero(inner == _WHITE))
+    if not empty.any():
+        return territory
+
+    # Bitmask of the stone colors next to each point; BLACK and WHITE are
+    # the bits 1 and 2, and the border and empty points add nothing.
+    stones = np.where(grid == _OFF_BOARD, _EMPTY, grid)
+    borders = stones[:-2, 1:-1] | stones[2:, 1:-1] | stones[1:-1, :-2] | stones[1:-1, 2:]
+
+    labels, num_labels = _label_empty_regions(empty)
+    region_labels = labels[empty]
+    region_borders = borders[empty]
+    touches_black = np.bincount(region_labels, region_borders & _BLACK, num_labels) > 0
+    touches_white = np.bincount(region_labels, region_borders & _WHITE, num_labels) > 0
+    region_sizes = np.bincount(region_labels, minlength=num_labels)
+
+    territory.num_black_territory = int(region_sizes[touches_black & ~touches_white].sum())
+    territory.num_white_territory = int(region_sizes[touches_white & ~touches_black].sum())
+    dame = empty & (touches_black == touches_white)[labels]
+    territory.num_dame = int(np.count_nonzero(dame))
+    territory.dame_points = [Point(row=int(r) + 1, col=int(c) + 1) for r, c in zip(*np.nonzero(dame))]
+    return territory
 
 
 def compute_game_result(game_state):
@@ -0,0 +1,51 @@
+import random
+import unittest
+
+from dlgo import goboard_array, goboard_fast, goboard_slow
+from dlgo.gotypes import Player, Point
+from dlgo.scoring import compute_game_result, evaluate_territory
+
+
+class EvaluateTerritoryTest(unittest.TestCase):
+    def test_territory_and_dame(self):
+        # .b.w.
+        # bb.ww
+        # .....
+        board = goboard_array.Board(3, 5)
+        for point in (Point(1, 2), Point(2, 1), Point(2, 2)):
+            board.place_stone(Player.black, point)
+        for point in (Point(1, 4), Point(2, 4), Point(2, 5)):
+            board.place_stone(Player.white, point)
+        territory = evaluate_territory(board)
+        self.assertEqual(3, territory.num_black_stones)
+        self.assertEqual(3, territory.num_white_stones)
+        self.assertEqual(1, territory.num_black_territory)
+        self.assertEqual(1, territory.num_white_territory)
+        self.assertEqual(7, territory.num_dame)
+        self.assertIn(Point(1, 3), territory.dame_points)
+        self.assertNotIn(Point(1, 1), territory.dame_points)
+
+    def test_backends_agree(self):
+        random.seed(11)
+        fast = goboard_fast.GameState.new_game(9)
+        for _ in range(80):
+            fast = fast.apply_move(random.choice(fast.legal_moves()[:-2]))
+        array_board = goboard_array.copy_board(fast.board)
+        expected = evaluate_territory(fast.board)
+        actual = evaluate_territory(array_board)
+        self.assertEqual(vars(expected), vars(actual))
+
+    def test_large_empty_region(self):
+        territory = evaluate_territory(goboard_slow.Board(60, 60))
+        self.assertEqual(3600, territory.num_dame)
+
+    def test_game_result(self):
+        game = goboard_array.GameState.new_game(5)
+        game = game.apply_move(goboard_array.Move.play(Point(3, 3)))
+        result = compute_game_result(game)
+        self.assertEqual((25, 0), (result.b, result.w))
+        self.assertEqual(Player.black, result.winner)
+
+
+if __name__ == '__main__':
+    unittest.main()